@@ -23,7 +23,7 @@ evaluate to True
 # -----------------------------------------------------------------------------
 # Imports
 # -----------------------------------------------------------------------------
-import json, exceptions
+import array, collections, copy, itertools, json, exceptions, marshal, mmap, multiprocessing, multiprocessing.pool, operator, os, re, sys, tempfile, threading
 
 # -----------------------------------------------------------------------------
 # The Safe None Class
@@ -50,7 +50,8 @@ class SafeNoneClass(object):
 
 	7)	PyMongo will store SafeNone as 0
 
-	8)	JSON.dumps(SafeNone) will yield 'SafeNone' not 'null'
+	8)	json.dumps(SafeNone) will raise a TypeError; safeJSON.dumps(SafeNone)
+		yields 'null'
 
 	As a note this object will evaluate to 'False' in boolean expressions.
 	"""
@@ -63,6 +64,13 @@ class SafeNoneClass(object):
 			cls._instance = super(SafeNoneClass, cls).__new__(cls, *args, **kwargs)
 		return cls._instance
 
+	def __reduce__(self):
+		"""
+		Pickles a reference to the module level SafeNone rather than a new 
+		instance, so that 'x is SafeNone' still holds after unpickling.
+		"""
+		return 'SafeNone'
+
 	def __getitem__(self, index):
 		"""
 		This method simulates array accesses.  Whenever this object is 
@@ -383,16 +391,32 @@ SafeNone = SafeNoneClass()
 class SafeList(list):
 	"""
 	Class that behaves exactly like list except that accesses to items not in 
-	the list will return SafeNone rather than raise an IndexError.
+	the list will return SafeNone rather than raise an IndexError.  This holds
+	for negative indexes too, and slices of a SafeList are SafeLists.
 	"""
 	def __getitem__(self, index):
-		if index < len(self) or type(index) != type(0):
-			return super(SafeList, self).__getitem__(index)
-		return SafeNone
+		# Only numbers can fall inside this range; anything else is ordered 
+		# after every number.
+		if -len(self) <= index < len(self):
+			return _listGetItem(self, index)
+		if type(index) == int or type(index) == long:
+			return SafeNone
+		if type(index) == slice:
+			return SafeList(_listGetItem(self, index))
+		return _listGetItem(self, index)
+
+	def __getslice__(self, i, j):
+		return SafeList(_listGetSlice(self, i, j))
 
 	def __delitem__(self, index):
-		if index < len(self) or type(index) != type(0):
-			return super(SafeList, self).__delitem__(index)
+		if -len(self) <= index < len(self) or not isinstance(index, (int, long)):
+			_listDelItem(self, index)
+
+# The list methods SafeList delegates to, looked up once rather than on every
+# access
+_listGetItem = list.__getitem__
+_listGetSlice = list.__getslice__
+_listDelItem = list.__delitem__
 
 # -----------------------------------------------------------------------------
 # The safe dict class
@@ -401,16 +425,1792 @@ class SafeDict(dict):
 	"""
 	Class that behaves exactly like dict except that accesses to items not in 
 	the dict will return SafeNone rather than raise a KeyError.
+
+	Rather than override __getitem__, SafeDict relies on dict calling 
+	__missing__ for keys it does not hold, so looking up a key that is present
+	costs the same as it does on a plain dict.
 	"""
-	def __getitem__(self, key):
-		if key in self:
-			return super(SafeDict, self).__getitem__(key)
+	def __missing__(self, key):
 		return SafeNone
 
 	def __delitem__(self, key):
 		if key in self:
 			return super(SafeDict, self).__delitem__(key)
 
+# -----------------------------------------------------------------------------
+# The frozen safe classes
+# -----------------------------------------------------------------------------
+def _refuseModification(self, *args, **kwargs):
+	raise TypeError('{0} objects cannot be modified.'.format(type(self).__name__))
+
+class FrozenSafeDict(SafeDict):
+	"""
+	A SafeDict that cannot be modified, so that it can be shared between 
+	threads without locking and used as a dict key or set member.  Its hash is
+	computed the first time it is needed and then cached.  Hashing needs all of
+	its values to be hashable, which they are when the whole tree is frozen.
+	As with SafeNone, copying one returns the same object.
+	"""
+	__slots__ = ('_hash',)
+
+	__setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _refuseModification
+
+	def __hash__(self):
+		try:
+			return self._hash
+		except AttributeError:
+			self._hash = hash(frozenset(self.iteritems()))
+			return self._hash
+
+	def copy(self):
+		return self
+
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
+
+	def __reduce__(self):
+		return (type(self), (dict(self),))
+
+class FrozenSafeList(SafeList):
+	"""
+	A SafeList that cannot be modified.  See FrozenSafeDict.  Slices of a 
+	FrozenSafeList are ordinary SafeLists, since they are copies.
+	"""
+	__slots__ = ('_hash',)
+
+	__setitem__ = __delitem__ = __setslice__ = __delslice__ = __iadd__ = __imul__ = _refuseModification
+	append = extend = insert = pop = remove = reverse = sort = _refuseModification
+
+	def __hash__(self):
+		try:
+			return self._hash
+		except AttributeError:
+			self._hash = hash(tuple(self))
+			return self._hash
+
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
+
+	def __reduce__(self):
+		return (type(self), (list(self),))
+
+# -----------------------------------------------------------------------------
+# The safe numeric array class
+# -----------------------------------------------------------------------------
+class SafeArray(array.array):
+	"""
+	An array.array of integers ('l') or floats ('d') that behaves like a 
+	SafeList when it is read.  Numbers are stored unboxed, so a SafeArray 
+	takes a fraction of the memory of a SafeList of the same numbers.  As 
+	with SafeList, indexes outside the array return SafeNone and slices are 
+	SafeArrays.  A SafeArray compares equal to a list of the same numbers, 
+	and adding a list to it, or it to a list, gives a SafeList.
+
+	It differs from a SafeList in two ways.  It is not a list, so 
+	isinstance(a, list) is False.  And it can only hold numbers of its own 
+	type: an integer array cannot be given floats, and neither kind can be 
+	given anything but numbers (integers put in a float array become 
+	floats).  Changes that would break this raise a TypeError and leave the
+	array as it was.  Copy it into a SafeList, as in SafeList(a), to hold 
+	other values.
+
+	The numbers can be used in bulk without copying them through the buffer 
+	interface, as in buffer(a), or as a NumPy array sharing the same memory
+	through asNumpy.
+	"""
+	__slots__ = ()
+
+	def __getitem__(self, index):
+		if -len(self) <= index < len(self):
+			return _arrayGetItem(self, index)
+		if type(index) == int or type(index) == long:
+			return SafeNone
+		if type(index) == slice:
+			return SafeArray(self.typecode, _arrayGetItem(self, index))
+		return _arrayGetItem(self, index)
+
+	def __getslice__(self, i, j):
+		return SafeArray(self.typecode, _arrayGetSlice(self, i, j))
+
+	def __setitem__(self, index, value):
+		if type(index) == slice:
+			value = self._numbers(value)
+		try:
+			_arraySetItem(self, index, value)
+		except (TypeError, OverflowError):
+			raise TypeError(self._refusal(value))
+
+	def __setslice__(self, i, j, values):
+		_arraySetSlice(self, i, j, self._numbers(values))
+
+	def append(self, value):
+		try:
+			_arrayAppend(self, value)
+		except (TypeError, OverflowError):
+			raise TypeError(self._refusal(value))
+
+	def insert(self, i, value):
+		try:
+			_arrayInsert(self, i, value)
+		except (TypeError, OverflowError):
+			raise TypeError(self._refusal(value))
+
+	def extend(self, values):
+		_arrayExtend(self, self._numbers(values))
+
+	def __iadd__(self, values):
+		_arrayExtend(self, self._numbers(values))
+		return self
+
+	def __add__(self, o):
+		o = unwrap(o)
+		if isinstance(o, array.array) and o.typecode == self.typecode:
+			return SafeArray(self.typecode, _arrayAdd(self, o))
+		if isinstance(o, (list, array.array)):
+			return SafeList(self.tolist() + list(o))
+		return NotImplemented
+
+	def __radd__(self, o):
+		o = unwrap(o)
+		if isinstance(o, list):
+			return SafeList(o + self.tolist())
+		return NotImplemented
+
+	def __mul__(self, n):
+		return SafeArray(self.typecode, _arrayMul(self, n))
+
+	__rmul__ = __mul__
+
+	def _numbers(self, values):
+		"""
+		Returns 'values' as an array of this array's type, so that changes 
+		made with several values either make all of them or none.
+		"""
+		if isinstance(values, array.array) and values.typecode == self.typecode:
+			return values
+		try:
+			return array.array(self.typecode, values)
+		except (TypeError, OverflowError):
+			raise TypeError(self._refusal(values))
+
+	def _refusal(self, value):
+		kind = 'integers' if self.typecode == 'l' else 'numbers'
+		return 'This SafeArray can only hold {0}, not {1!r}; copy it into a SafeList to hold other values.'.format(kind, value)
+
+	def __delitem__(self, index):
+		if -len(self) <= index < len(self) or not isinstance(index, (int, long)):
+			_arrayDelItem(self, index)
+
+	def __eq__(self, o):
+		o = unwrap(o)
+		if isinstance(o, list):
+			return len(self) == len(o) and self.tolist() == o
+		return array.array.__eq__(self, o)
+
+	def __ne__(self, o):
+		equal = self.__eq__(o)
+		return equal if equal is NotImplemented else not equal
+
+	__hash__ = None
+
+	def __copy__(self):
+		return SafeArray(self.typecode, self)
+
+	def __deepcopy__(self, memo):
+		return SafeArray(self.typecode, self)
+
+	def __repr__(self):
+		return 'SafeArray({0!r}, {1!r})'.format(self.typecode, self.tolist())
+
+	def asNumpy(self):
+		"""
+		Returns a NumPy array that shares this array's memory, so changes to 
+		either are seen in both.  Raises a ValueError if NumPy is not 
+		installed.
+		"""
+		numpy = _numpy()
+		if numpy is None:
+			raise ValueError('NumPy is not installed.')
+		return numpy.frombuffer(self, dtype=self.typecode)
+
+# The array methods SafeArray delegates to
+_arrayGetItem = array.array.__getitem__
+_arrayGetSlice = array.array.__getslice__
+_arrayDelItem = array.array.__delitem__
+_arraySetItem = array.array.__setitem__
+_arraySetSlice = array.array.__setslice__
+_arrayAppend = array.array.append
+_arrayInsert = array.array.insert
+_arrayExtend = array.array.extend
+_arrayAdd = array.array.__add__
+_arrayMul = array.array.__mul__
+
+def _compactArray(l):
+	"""
+	Returns the list of numbers 'l' as a SafeArray if they are all integers 
+	or all floats, or None if they are not.
+	"""
+	types = set(map(type, l))
+	if len(types) != 1:
+		return None
+	t = types.pop()
+	if t is float:
+		return SafeArray('d', l)
+	if t is int:
+		try:
+			return SafeArray('l', l)
+		except OverflowError:
+			return None
+	return None
+
+# -----------------------------------------------------------------------------
+# The safe record classes
+# -----------------------------------------------------------------------------
+class SafeRecord(object):
+	"""
+	Base class of the record types made by recordType.  A record holds the 
+	values of a fixed set of fields in slots rather than in a hash table of 
+	its own, so it takes a fraction of the memory of a SafeDict holding the 
+	same values.  The field names and the slots they are kept in are shared 
+	by every record of a type.
+
+	Records are subscripted like SafeDicts, and return SafeNone for fields 
+	they do not have.  They have the read only dict methods and compare equal
+	to dicts holding the same items.  The value of a field can be replaced,
+	but fields cannot be added or removed.
+	"""
+	__slots__ = ()
+
+	# The field names, and the name of the slot each is kept in
+	_fields = ()
+	_slotNames = {}
+
+	def __getitem__(self, key):
+		try:
+			return getattr(self, self._slotNames[key])
+		except KeyError:
+			return SafeNone
+
+	def __setitem__(self, key, value):
+		try:
+			setattr(self, self._slotNames[key], value)
+		except KeyError:
+			raise KeyError('Records have no field {0!r}.'.format(key))
+
+	def __delitem__(self, key):
+		if key in self._slotNames:
+			raise TypeError('Fields cannot be removed from records.')
+
+	def get(self, key, default=None):
+		if key in self._slotNames:
+			return getattr(self, self._slotNames[key])
+		return default
+
+	def __contains__(self, key):
+		return key in self._slotNames
+
+	def has_key(self, key):
+		return key in self._slotNames
+
+	def __len__(self):
+		return len(self._fields)
+
+	def __iter__(self):
+		return iter(self._fields)
+
+	def keys(self):
+		return list(self._fields)
+
+	def iterkeys(self):
+		return iter(self._fields)
+
+	def values(self):
+		return [getattr(self, name) for name in self.__slots__]
+
+	def itervalues(self):
+		for name in self.__slots__:
+			yield getattr(self, name)
+
+	def items(self):
+		return zip(self._fields, self.values())
+
+	def iteritems(self):
+		return itertools.izip(self._fields, self.itervalues())
+
+	def copy(self):
+		return type(self)(*self.values())
+
+	def __eq__(self, o):
+		if isinstance(o, SafeRecord):
+			return self.items() == o.items() or dict(self.iteritems()) == dict(o.iteritems())
+		if isinstance(o, (dict, SafeDictView)):
+			return dict(self.iteritems()) == o
+		return NotImplemented
+
+	def __ne__(self, o):
+		equal = self.__eq__(o)
+		return equal if equal is NotImplemented else not equal
+
+	__hash__ = None
+
+	def __repr__(self):
+		return 'SafeRecord({{{0}}})'.format(', '.join('{0!r}: {1!r}'.format(key, value) for key, value in self.iteritems()))
+
+	def __reduce__(self):
+		return (_makeRecord, (self._fields, tuple(self.values())))
+
+def recordType(fields):
+	"""
+	Returns the SafeRecord subclass holding the given sequence of field names.
+	Asking for the same fields again returns the same class.  The class is 
+	constructed with the values of the fields, in order.
+	"""
+	fields = tuple(fields)
+	try:
+		return _recordTypes[fields]
+	except KeyError:
+		pass
+	if not fields or len(set(fields)) != len(fields):
+		raise ValueError('Records need distinct field names, not {0!r}.'.format(fields))
+	if len(fields) > _MAX_FIELDS:
+		raise ValueError('Records can have at most {0} fields.'.format(_MAX_FIELDS))
+	slots = tuple('_{0}'.format(i) for i in xrange(len(fields)))
+	# The constructor is generated, as namedtuple's is, so that it sets each
+	# slot directly rather than looping over them
+	namespace = {}
+	exec 'def __init__(self, {0}):\n\t{1}\n'.format(', '.join(slots), '\n\t'.join('self.{0} = {0}'.format(slot) for slot in slots)) in namespace
+	cls = type('SafeRecord', (SafeRecord,), {
+		'__slots__': slots,
+		'__init__': namespace['__init__'],
+		'_fields': fields,
+		'_slotNames': dict(zip(fields, slots))
+	})
+	return _recordTypes.setdefault(fields, cls)
+
+# The record types made so far, by their fields
+_recordTypes = {}
+
+# Python functions take at most 255 arguments
+_MAX_FIELDS = 255
+
+def _makeRecord(fields, values):
+	"""
+	Rebuilds a pickled record.
+	"""
+	return recordType(fields)(*values)
+
+def inferSchemas(samples, minCount=2):
+	"""
+	Returns the field names of the objects that occur at least 'minCount' 
+	times in the sample documents 'samples', most common first, for use as a
+	parser's 'schemas'.  Objects anywhere in the documents are counted, and
+	two objects have the same fields if they have the same keys in any order.
+	"""
+	counts = collections.Counter()
+	fields = {}
+	stack = list(samples)
+	while stack:
+		o = unwrap(stack.pop())
+		if isinstance(o, (dict, SafeRecord)):
+			keys = frozenset(o)
+			if 0 < len(keys) <= _MAX_FIELDS:
+				counts[keys] += 1
+				fields.setdefault(keys, tuple(o))
+			stack.extend(o.itervalues())
+		elif isinstance(o, list):
+			stack.extend(o)
+	return [fields[keys] for keys, count in counts.most_common() if count >= minCount]
+
+# -----------------------------------------------------------------------------
+# The lazy safe view classes
+# -----------------------------------------------------------------------------
+class SafeDictView(object):
+	"""
+	A read only view of a plain dict that behaves like a SafeDict.  Nothing is
+	copied when the view is created.  Instead, nested dicts and lists are 
+	wrapped in views of their own when they are accessed, so wrapping a dict 
+	costs the same however large it is.
+	"""
+	__slots__ = ('_o',)
+
+	def __init__(self, o):
+		self._o = o
+
+	def __getitem__(self, key):
+		try:
+			return wrap(self._o[key])
+		except KeyError:
+			return SafeNone
+
+	def get(self, key, default=None):
+		if key in self._o:
+			return wrap(self._o[key])
+		return default
+
+	def __contains__(self, key):
+		return key in self._o
+
+	def has_key(self, key):
+		return key in self._o
+
+	def __len__(self):
+		return len(self._o)
+
+	def __iter__(self):
+		return iter(self._o)
+
+	def keys(self):
+		return self._o.keys()
+
+	def iterkeys(self):
+		return iter(self._o)
+
+	def values(self):
+		return [wrap(value) for value in self._o.itervalues()]
+
+	def itervalues(self):
+		for value in self._o.itervalues():
+			yield wrap(value)
+
+	def items(self):
+		return [(key, wrap(value)) for key, value in self._o.iteritems()]
+
+	def iteritems(self):
+		for key, value in self._o.iteritems():
+			yield key, wrap(value)
+
+	def __eq__(self, o):
+		return self._o == unwrap(o)
+
+	def __ne__(self, o):
+		return not self.__eq__(o)
+
+	__hash__ = None
+
+	def __repr__(self):
+		return 'SafeDictView({0!r})'.format(self._o)
+
+	def __reduce__(self):
+		return (SafeDictView, (self._o,))
+
+class SafeListView(object):
+	"""
+	A read only view of a plain list that behaves like a SafeList.  As with
+	SafeDictView, nested dicts and lists are only wrapped when accessed.
+	"""
+	__slots__ = ('_o',)
+
+	def __init__(self, o):
+		self._o = o
+
+	def __getitem__(self, index):
+		if type(index) == slice:
+			return SafeListView(self._o[index])
+		try:
+			return wrap(self._o[index])
+		except IndexError:
+			return SafeNone
+
+	def __contains__(self, value):
+		return unwrap(value) in self._o
+
+	def __len__(self):
+		return len(self._o)
+
+	def __iter__(self):
+		for value in self._o:
+			yield wrap(value)
+
+	def __reversed__(self):
+		for value in reversed(self._o):
+			yield wrap(value)
+
+	def count(self, value):
+		return self._o.count(unwrap(value))
+
+	def index(self, value, *args):
+		return self._o.index(unwrap(value), *args)
+
+	def __eq__(self, o):
+		return self._o == unwrap(o)
+
+	def __ne__(self, o):
+		return not self.__eq__(o)
+
+	__hash__ = None
+
+	def __repr__(self):
+		return 'SafeListView({0!r})'.format(self._o)
+
+	def __reduce__(self):
+		return (SafeListView, (self._o,))
+
+def wrap(o):
+	"""
+	Returns a safe view of 'o' if it is a plain dict or list, or 'o' itself 
+	otherwise.  Unlike SafeJSONParser.transcode this does not copy anything, so
+	it is a cheap way to make objects parsed elsewhere safe to subscript.
+	"""
+	if type(o) == dict:
+		return SafeDictView(o)
+	elif type(o) == list:
+		return SafeListView(o)
+	elif isinstance(o, dict) and not isinstance(o, SafeDict):
+		return SafeDictView(o)
+	elif isinstance(o, list) and not isinstance(o, SafeList):
+		return SafeListView(o)
+	return o
+
+def unwrap(o):
+	"""
+	Returns the object underneath a safe view, or 'o' itself if it is not a
+	view.
+	"""
+	if isinstance(o, (SafeDictView, SafeListView)):
+		return o._o
+	return o
+
+# -----------------------------------------------------------------------------
+# Missing field telemetry
+# -----------------------------------------------------------------------------
+class MissingFieldTelemetry(object):
+	"""
+	Counts the accesses to safe containers that returned SafeNone because the
+	key or index was missing, by key.  Misses on arrays are counted under the
+	index in brackets, as in '[3]'.  JSON object keys are always strings, so
+	these cannot be confused with object keys.
+
+	To keep the cost down only one miss in every 'sampleEvery' is recorded, 
+	and it is counted 'sampleEvery' times, so the counts are estimates when
+	sampling.  Counts may also be slightly low when several threads miss at 
+	once.  See enableTelemetry.
+	"""
+	def __init__(self, sampleEvery=1):
+		if sampleEvery < 1:
+			raise ValueError('sampleEvery must be at least 1.')
+		self.sampleEvery = sampleEvery
+		self.counts = collections.Counter()
+		self._countdown = sampleEvery
+
+	def record(self, key):
+		"""
+		Records a miss on 'key', if it is one of the misses sampled.
+		"""
+		self._countdown -= 1
+		if self._countdown > 0:
+			return
+		self._countdown = self.sampleEvery
+		if type(key) == int or type(key) == long:
+			key = '[{0}]'.format(key)
+		self.counts[key] += self.sampleEvery
+
+	def snapshot(self):
+		"""
+		Returns a dict of the counts so far, for exporting to a metrics system.
+		"""
+		return dict(self.counts)
+
+	def mostCommon(self, n=None):
+		"""
+		Returns the 'n' most often missing keys and their counts.
+		"""
+		return self.counts.most_common(n)
+
+	def reset(self):
+		"""
+		Clears the counts.
+		"""
+		self.counts.clear()
+		self._countdown = self.sampleEvery
+
+	def __repr__(self):
+		return 'MissingFieldTelemetry({0!r})'.format(self.mostCommon(10))
+
+def enableTelemetry(sampleEvery=1):
+	"""
+	Starts counting the keys and indexes that SafeDicts, SafeLists, SafeArrays,
+	records and the safe views return SafeNone for, and returns the 
+	MissingFieldTelemetry they are counted in.  Only every 'sampleEvery'th 
+	miss is recorded.
+
+	Counting versions of the containers' __getitem__ methods, and of 
+	SafeDict's __missing__, are swapped into the classes while telemetry is
+	enabled, so while it is disabled accesses cost exactly what they would 
+	without telemetry.  A value stored as SafeNone, as projections leave in
+	arrays, is counted as a miss too.
+	"""
+	global telemetry
+	counted = MissingFieldTelemetry(sampleEvery)
+	for cls, name, method in _UNCOUNTED:
+		setattr(cls, name, _counting(method, counted))
+	telemetry = counted
+	return counted
+
+def disableTelemetry():
+	"""
+	Stops counting missing keys and restores the original methods.  The 
+	counts gathered so far stay in the MissingFieldTelemetry object.
+	"""
+	global telemetry
+	for cls, name, method in _UNCOUNTED:
+		setattr(cls, name, method)
+	telemetry = None
+
+# The telemetry being recorded, if it is enabled
+telemetry = None
+
+# The classes, names and uncounted versions of the methods that 
+# enableTelemetry swaps out
+_UNCOUNTED = [(cls, name, cls.__dict__[name]) for cls, name in [
+	(SafeDict, '__missing__'),
+	(SafeRecord, '__getitem__'),
+	(SafeDictView, '__getitem__'),
+	(SafeList, '__getitem__'),
+	(SafeArray, '__getitem__'),
+	(SafeListView, '__getitem__')
+]]
+
+def _counting(method, telemetry):
+	"""
+	Returns a version of the container method 'method' that records the keys
+	it returns SafeNone for in 'telemetry'.  Every counting method is made 
+	here from the method it replaces, so the two cannot drift apart.  The 
+	telemetry is bound in rather than read from the global, so a method 
+	still running while telemetry is disabled never sees it as None.
+	"""
+	def counting(self, key):
+		value = method(self, key)
+		if value is SafeNone:
+			telemetry.record(key)
+		return value
+	return counting
+
+# -----------------------------------------------------------------------------
+# The compiled path class
+# -----------------------------------------------------------------------------
+class SafePath(object):
+	"""
+	A path expression such as 'results[0].child_items[0].name', parsed once so
+	that it can be evaluated against many documents.  Keys are separated by
+	dots, array indexes are given in brackets and keys that are not plain 
+	names can be given as quoted strings in brackets, as in 'a["b.c"]'.  A '*',
+	either as a key or in brackets, matches every value of an object or array.
+
+	'get' works on safe and plain trees alike.  It returns SafeNone if any 
+	step of the path is missing.  Paths with a wildcard return a SafeList of 
+	every value they match.
+	"""
+	_TOKEN = re.compile(r'(?:^|\.)([^.\[\]"]+)|\[(-?\d+|\*)\]|\[("(?:[^"\\]|\\.)*")\]')
+
+	def __init__(self, expression):
+		self.expression = expression
+		self.steps = []
+		pos = 0
+		while pos < len(expression):
+			m = self._TOKEN.match(expression, pos)
+			if m is None or m.end() == pos:
+				raise ValueError('Invalid path {0!r} at {1}.'.format(expression, pos))
+			name, index, quoted = m.groups()
+			if name is not None:
+				self.steps.append(_WILDCARD if name == '*' else name)
+			elif index is not None:
+				self.steps.append(_WILDCARD if index == '*' else int(index))
+			else:
+				self.steps.append(json.loads(quoted))
+			pos = m.end()
+		self.wildcard = _WILDCARD in self.steps
+		self._steps = [(step, type(step) == int) for step in self.steps]
+
+	def get(self, o):
+		"""
+		Returns the value at this path in 'o', or SafeNone if there is none.
+		"""
+		if self.wildcard:
+			return self._getAll(o)
+		for step, isIndex in self._steps:
+			if isIndex and isinstance(o, basestring):
+				return SafeNone
+			try:
+				o = o[step]
+			except (KeyError, IndexError, TypeError):
+				return SafeNone
+		return o
+
+	def getMany(self, docs):
+		"""
+		Returns a SafeList holding the value at this path in each of 'docs'.
+		"""
+		get = self.get
+		return SafeList([get(o) for o in docs])
+
+	def _getAll(self, o):
+		nodes = [o]
+		for step, isIndex in self._steps:
+			found = []
+			if step is _WILDCARD:
+				for node in nodes:
+					if isinstance(node, (list, SafeListView, SafeArray)):
+						found.extend(node)
+					elif hasattr(node, 'itervalues'):
+						found.extend(node.itervalues())
+			else:
+				for node in nodes:
+					if isIndex and isinstance(node, basestring):
+						continue
+					try:
+						value = node[step]
+					except (KeyError, IndexError, TypeError):
+						continue
+					if value is not SafeNone:
+						found.append(value)
+			nodes = found
+		return SafeList(nodes)
+
+	def __repr__(self):
+		return 'SafePath({0!r})'.format(self.expression)
+
+class _Wildcard(object):
+	"""
+	Marks a wildcard step in SafePath.steps.
+	"""
+	def __repr__(self):
+		return '*'
+
+_WILDCARD = _Wildcard()
+
+_pathCache = {}
+_MAXCACHE = 512
+
+def path(expression):
+	"""
+	Returns the SafePath for 'expression'.  Compiled paths are cached, so
+	calling this repeatedly with the same expression is cheap.
+	"""
+	try:
+		return _pathCache[expression]
+	except KeyError:
+		pass
+	if len(_pathCache) >= _MAXCACHE:
+		_pathCache.clear()
+	compiled = _pathCache[expression] = SafePath(expression)
+	return compiled
+
+# -----------------------------------------------------------------------------
+# Columnar extraction
+# -----------------------------------------------------------------------------
+def columns(records, paths, fill=None, masks=False, useNumpy=None):
+	"""
+	Extracts the value at each of 'paths' from every one of 'records' in one
+	pass, and returns an OrderedDict mapping each path to a column holding its
+	values in record order.  'records' may be any iterable of safe or plain 
+	objects, such as a SafeList or an iterLoad reader.  Paths are path 
+	expressions without wildcards (see SafePath).
+
+	Columns of numbers are stored compactly: an array('l') if every value is an
+	integer that fits, otherwise an array('d').  If 'useNumpy' is True, or is
+	None and NumPy is installed, they are NumPy arrays instead.  Any other 
+	column is a list.
+
+	Values that are missing or null are replaced by 'fill'.  In a numeric 
+	column a 'fill' of None stands for NaN, which makes the column floating
+	point.  If 'masks' is True a second OrderedDict is returned as well, 
+	mapping each path to an array('b'), or NumPy array of booleans, that is 1
+	where the value was missing or null.
+	"""
+	compiled = [path(expression) for expression in paths]
+	for p in compiled:
+		if p.wildcard:
+			raise ValueError('Wildcards cannot be used in {0!r}.'.format(p.expression))
+	values = [[] for p in compiled]
+	records = iter(records)
+	while True:
+		chunk = list(itertools.islice(records, _COLUMN_CHUNK))
+		if not chunk:
+			break
+		for p, column in zip(compiled, values):
+			column.extend(_extract(p, chunk))
+	if useNumpy is None:
+		useNumpy = _numpy() is not None
+	result = collections.OrderedDict()
+	missing = collections.OrderedDict()
+	for expression, column in zip(paths, values):
+		result[expression], missing[expression] = _compactColumn(column, fill, useNumpy)
+	if masks:
+		return result, missing
+	return result
+
+def _extract(p, records):
+	"""
+	Returns the value at path 'p' in each of 'records'.  Each step is applied
+	to every record with map, which is much quicker than SafePath.get, and
+	relies on safe containers returning SafeNone for missing values.  If a 
+	step raises, as it does on plain containers, get is used instead.
+	"""
+	values = records
+	try:
+		for step, isIndex in p._steps:
+			if isIndex and any(issubclass(t, basestring) for t in set(map(type, values))):
+				break
+			values = map(operator.itemgetter(step), values)
+		else:
+			return values
+	except (KeyError, IndexError, TypeError):
+		pass
+	return map(p.get, records)
+
+# The number of records 'columns' extracts from at a time
+_COLUMN_CHUNK = 4096
+
+def _compactColumn(values, fill, useNumpy):
+	"""
+	Turns the list of 'values' extracted by 'columns' into a column and its 
+	mask, filling in missing values.
+	"""
+	present = set(map(type, values))
+	if type(None) in present or SafeNoneClass in present:
+		mask = array.array('b', [value is None or value is SafeNone for value in values])
+		present -= _MISSING_TYPES
+		if fill is None and present and present <= _NUMBER_TYPES:
+			fill = float('nan')
+		values = [fill if isMissing else value for value, isMissing in zip(values, mask)]
+		if present:
+			present.add(type(fill))
+	else:
+		mask = array.array('b', [0]) * len(values)
+	column = values
+	if present and present <= _NUMBER_TYPES:
+		try:
+			column = array.array('d' if float in present else 'l', values)
+		except OverflowError:
+			pass
+	if useNumpy:
+		numpy = _numpy()
+		if numpy is None:
+			raise ValueError('NumPy is not installed.')
+		if type(column) == array.array:
+			column = numpy.frombuffer(column, dtype=column.typecode)
+		mask = numpy.frombuffer(mask, dtype=numpy.bool_)
+	return column, mask
+
+_MISSING_TYPES = frozenset([type(None), SafeNoneClass])
+_NUMBER_TYPES = frozenset([int, long, float])
+
+def _numpy():
+	"""
+	Returns the numpy module, or None if it is not installed.  It is only 
+	imported when first needed, since importing it is slow.
+	"""
+	if not _numpyModule:
+		try:
+			import numpy
+			_numpyModule.append(numpy)
+		except ImportError:
+			_numpyModule.append(None)
+	return _numpyModule[0]
+
+_numpyModule = []
+
+# -----------------------------------------------------------------------------
+# The JSON Lines reader class
+# -----------------------------------------------------------------------------
+class SafeJSONLinesFeed(object):
+	"""
+	Push parser for JSON Lines data that arrives in pieces, for example from a
+	socket read by an event loop.  Each call to 'feed' returns the records 
+	whose lines the new data completes, so nothing ever waits for more data.
+	'close' returns the last record if the data did not end with a newline.
+
+	Blank lines are ignored.  A malformed line raises a ValueError naming the
+	line unless 'skipMalformed' is True, in which case the line is skipped and
+	counted in 'malformed'.
+
+	If 'where' is given only the records it selects are returned, and the 
+	counts of records scanned, matched and rejected are kept in 'filter'.  
+	See RecordFilter.
+	"""
+	def __init__(self, parser, skipMalformed=False, where=None):
+		self.parser = parser
+		self.skipMalformed = skipMalformed
+		self.filter = _recordFilter(where)
+		self.lineNumber = 0
+		self.records = 0
+		self.malformed = 0
+		self._pieces = []
+
+	def feed(self, data):
+		"""
+		Adds 'data', a string or bytes-like object, to the feed and returns a
+		list of the records it completes.
+		"""
+		lines = _asString(data).split('\n')
+		self._pieces.append(lines[0])
+		if len(lines) == 1:
+			return []
+		lines[0] = ''.join(self._pieces)
+		self._pieces = [lines.pop()]
+		return self._parseLines(lines)
+
+	def close(self):
+		"""
+		Returns a list holding the record on the final line if it was not 
+		ended by a newline.
+		"""
+		tail = ''.join(self._pieces)
+		self._pieces = []
+		if tail:
+			return self._parseLines([tail])
+		return []
+
+	def _parseLines(self, lines):
+		records = []
+		for line in lines:
+			o = self._parseLine(line)
+			if o is not _SKIPPED:
+				records.append(o)
+		return records
+
+	def _parseLine(self, line):
+		"""
+		Parses one line, returning _SKIPPED for blank lines and skipped 
+		malformed lines.
+		"""
+		self.lineNumber += 1
+		if not line.strip():
+			return _SKIPPED
+		try:
+			if self.filter is None:
+				o = self.parser.loads(line)
+			else:
+				o = self.filter.apply(self.parser, line)
+		except ValueError as e:
+			if not self.skipMalformed:
+				raise ValueError('Line {0}: {1}'.format(self.lineNumber, e))
+			self.malformed += 1
+			return _SKIPPED
+		if o is not _SKIPPED:
+			self.records += 1
+		return o
+
+# Returned by SafeJSONLinesFeed._parseLine for lines that hold no record
+_SKIPPED = object()
+
+class RecordFilter(object):
+	"""
+	Selects the records that SafeJSONParser's readers keep, as cheaply as it 
+	can, and counts the records it has 'scanned', 'matched' and 'rejected'.
+
+	'where' is either a dict mapping path expressions (see SafePath) to the 
+	value each record must hold there, or a function that is given a record 
+	and returns whether to keep it.  A record that is missing a path does not
+	match it, whatever the value.  Values are compared as JSON compares 
+	them, so true and false are not the numbers 1 and 0.
+
+	Records are tested before any safe containers are built for them.  The
+	text is parsed into plain containers, and only the records that are kept
+	are transcoded.  Functions are given a safe view of the plain record (see
+	wrap).  Before that, if 'prefilter' is True, the text of a record is 
+	searched for each of the strings, booleans and nulls in 'where' as JSON 
+	would write them, and records missing any of them are rejected without 
+	being parsed at all.  The search assumes the values are not written with
+	needless escapes, as in "cl\\u0069ck", which JSON allows but encoders do
+	not do.  Records rejected this way are also counted in 'prefiltered'.
+
+	Parsers that build records or intern strings do so while parsing, so with
+	those every record is parsed in full before it is tested.
+	"""
+	def __init__(self, where, prefilter=True):
+		self.where = where
+		self.prefilter = prefilter
+		self.scanned = 0
+		self.matched = 0
+		self.rejected = 0
+		self.prefiltered = 0
+		self._needles = []
+		if callable(where):
+			self._conditions = None
+			return
+		self._conditions = [(path(expression), value) for expression, value in where.iteritems()]
+		for p, value in self._conditions:
+			if p.wildcard:
+				raise ValueError('Wildcards cannot be used in {0!r}.'.format(p.expression))
+			if prefilter:
+				needle = _needle(value)
+				if needle is not None:
+					self._needles.append(needle)
+
+	def apply(self, parser, s):
+		"""
+		Parses the record in the string 's' with 'parser' and returns it if it
+		matches, or _SKIPPED if it does not.
+		"""
+		self.scanned += 1
+		for needle in self._needles:
+			if needle not in s:
+				self.rejected += 1
+				self.prefiltered += 1
+				return _SKIPPED
+		o = parser.loadsWhere(s, self.matches, _SKIPPED)
+		if o is _SKIPPED:
+			self.rejected += 1
+			return _SKIPPED
+		self.matched += 1
+		return o
+
+	def matches(self, o):
+		"""
+		Returns whether the decoded record 'o' matches.
+		"""
+		if self._conditions is None:
+			return bool(self.where(wrap(o)))
+		for p, value in self._conditions:
+			found = p.get(o)
+			if found is SafeNone or not _jsonEqual(found, value):
+				return False
+		return True
+
+	def add(self, counts):
+		"""
+		Adds the counts of another RecordFilter, given as a tuple of scanned,
+		matched, rejected and prefiltered.
+		"""
+		self.scanned += counts[0]
+		self.matched += counts[1]
+		self.rejected += counts[2]
+		self.prefiltered += counts[3]
+
+	def counts(self):
+		return (self.scanned, self.matched, self.rejected, self.prefiltered)
+
+	def __repr__(self):
+		return 'RecordFilter(scanned={0}, matched={1}, rejected={2})'.format(self.scanned, self.matched, self.rejected)
+
+def _needle(value):
+	"""
+	Returns the text that any JSON holding 'value' must contain, or None if
+	'value' could be written in more than one way.
+	"""
+	if value is None:
+		return 'null'
+	if value is True:
+		return 'true'
+	if value is False:
+		return 'false'
+	if isinstance(value, basestring) and _PLAIN_STRING.match(value):
+		return '"{0}"'.format(str(value))
+	return None
+
+# Strings that JSON encoders write as they are, without escapes
+_PLAIN_STRING = re.compile(r'[ !#-.0-\[\]-~]*\Z')
+
+def _jsonEqual(a, b):
+	"""
+	Returns whether 'a' and 'b' are equal as JSON values, which unlike Python
+	does not count booleans as numbers.  Safe containers are compared by 
+	their contents.
+	"""
+	stack = [(unwrap(a), unwrap(b))]
+	while stack:
+		a, b = stack.pop()
+		if isinstance(a, bool) or isinstance(b, bool) or a is None or b is None:
+			if type(a) is not type(b):
+				return False
+		if isinstance(a, dict):
+			if not isinstance(b, dict) or len(a) != len(b):
+				return False
+			for key, value in a.iteritems():
+				if key not in b:
+					return False
+				stack.append((value, b[key]))
+		elif isinstance(a, (list, array.array)):
+			if not isinstance(b, (list, array.array)) or len(a) != len(b):
+				return False
+			stack.extend(itertools.izip(a, b))
+		elif isinstance(b, (dict, list, array.array)) or a != b:
+			return False
+	return True
+
+def _recordFilter(where):
+	"""
+	Returns 'where' as a RecordFilter.
+	"""
+	if where is None or isinstance(where, RecordFilter):
+		return where
+	return RecordFilter(where)
+
+class SafeJSONLinesReader(SafeJSONLinesFeed):
+	"""
+	Iterator over the records of a JSON Lines file.  The file is read in chunks
+	of 'chunkSize' bytes and each line is parsed with 'parser' as it is reached,
+	so only one record is held in memory at a time no matter how large the
+	file is.  Blank and malformed lines are handled as by SafeJSONLinesFeed.
+	"""
+	def __init__(self, parser, f, skipMalformed=False, chunkSize=65536, where=None):
+		super(SafeJSONLinesReader, self).__init__(parser, skipMalformed, where)
+		self._lines = self._readLines(f, chunkSize)
+
+	def __iter__(self):
+		return self
+
+	def next(self):
+		for line in self._lines:
+			o = self._parseLine(line)
+			if o is not _SKIPPED:
+				return o
+		raise StopIteration()
+
+	def _readLines(self, f, chunkSize):
+		"""
+		Splits the contents of 'f' into lines, reading it 'chunkSize' bytes at a
+		time.
+		"""
+		pieces = []
+		while True:
+			chunk = f.read(chunkSize)
+			if not chunk:
+				break
+			lines = chunk.split('\n')
+			if len(lines) == 1:
+				pieces.append(chunk)
+				continue
+			pieces.append(lines[0])
+			yield ''.join(pieces)
+			for i in xrange(1, len(lines) - 1):
+				yield lines[i]
+			pieces = [lines[-1]]
+		tail = ''.join(pieces)
+		if tail:
+			yield tail
+
+# -----------------------------------------------------------------------------
+# The incremental JSON reader class
+# -----------------------------------------------------------------------------
+class _JSONStream(object):
+	"""
+	A cursor over a JSON document that is read from a file a chunk at a time.
+	Values are never parsed here.  The cursor only finds where they begin and 
+	end, so that they can be skipped or handed to a parser as text.  Text 
+	behind the cursor is discarded as the cursor moves between values, so the
+	buffer never holds much more than the value being read.  To go back, the
+	file is read again from where the cursor should be, so files that cannot
+	seek cannot go back.
+	"""
+	_STRING_END = re.compile(r'["\\]')
+	_STRUCTURE = re.compile(r'["\[\]{}]')
+	_SCALAR = re.compile(r'[^,:\]}\s]*')
+	_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+	def __init__(self, f, chunkSize=65536):
+		self.f = f
+		self.chunkSize = chunkSize
+		self.buffer = ''
+		self.pos = 0
+		self.offset = 0
+		self.eof = False
+		try:
+			self.origin = f.tell()
+		except (AttributeError, IOError):
+			self.origin = None
+
+	def rewind(self, offset):
+		"""
+		Moves the cursor back to 'offset', an offset returned by tell.
+		"""
+		if self.origin is None:
+			raise ValueError('Negative indexes can only be used with files that can seek.')
+		self.f.seek(self.origin + offset)
+		self.buffer = ''
+		self.pos = 0
+		self.offset = offset
+		self.eof = False
+
+	def _fill(self):
+		"""
+		Appends the next chunk of the file to the buffer.  Returns False at the
+		end of the file.
+		"""
+		if self.eof:
+			return False
+		chunk = self.f.read(self.chunkSize)
+		if not chunk:
+			self.eof = True
+			return False
+		self.buffer += chunk
+		return True
+
+	def tell(self):
+		"""
+		The offset of the cursor from the start of the file.
+		"""
+		return self.offset + self.pos
+
+	def peek(self):
+		"""
+		Moves the cursor past any whitespace and returns the next character, or
+		an empty string at the end of the file.
+		"""
+		if self.pos >= self.chunkSize:
+			self.buffer = self.buffer[self.pos:]
+			self.offset += self.pos
+			self.pos = 0
+		while True:
+			self.pos = self._WHITESPACE.match(self.buffer, self.pos).end()
+			if self.pos < len(self.buffer) or not self._fill():
+				break
+		return self.buffer[self.pos:self.pos + 1]
+
+	def expect(self, c):
+		if self.peek() != c:
+			raise ValueError('Expected {0!r} at offset {1}.'.format(c, self.tell()))
+		self.pos += 1
+
+	def readValue(self):
+		"""
+		Moves the cursor past the value at the cursor and returns its text.
+		"""
+		c = self.peek()
+		start = self.pos
+		if c == '"':
+			end = self._scanString(start + 1)
+		elif c == '[' or c == '{':
+			end = self._scanContainer(start)
+		elif c:
+			end = self._scanScalar(start)
+		else:
+			raise ValueError('Unexpected end of document.')
+		self.pos = end
+		return self.buffer[start:end]
+
+	def readKey(self):
+		key = json.loads(self.readValue())
+		self.expect(':')
+		return key
+
+	def seek(self, path):
+		"""
+		Moves the cursor to the value at 'path'.  Returns False if there is no
+		such value.  Negative indexes count from the end of their array, which
+		is found by reading past the whole array once and then going back.
+		"""
+		for step in path:
+			if type(step) == int:
+				if self.peek() != '[':
+					return False
+				if step < 0:
+					start = self.tell()
+					step += sum(1 for member in self.iterMembers())
+					if step < 0:
+						return False
+					self.rewind(start)
+					self.peek()
+				self.pos += 1
+				for i in xrange(step):
+					if self.peek() == ']':
+						return False
+					self.readValue()
+					if self.peek() != ',':
+						return False
+					self.pos += 1
+				if self.peek() == ']':
+					return False
+				continue
+			if self.peek() != '{':
+				return False
+			self.pos += 1
+			while True:
+				if self.peek() != '"':
+					return False
+				if self.readKey() == step:
+					break
+				self.readValue()
+				if self.peek() == ',':
+					self.pos += 1
+		return True
+
+	def iterMembers(self):
+		"""
+		Yields the key, or None in an array, and the start and end offsets of 
+		each member of the object or array at the cursor, leaving the cursor 
+		after it.
+		"""
+		isObject = self.peek() == '{'
+		self.expect('{' if isObject else '[')
+		close = '}' if isObject else ']'
+		if self.peek() == close:
+			self.pos += 1
+			return
+		while True:
+			key = self.readKey() if isObject else None
+			self.peek()
+			start = self.tell()
+			self.readValue()
+			yield key, start, self.tell()
+			c = self.peek()
+			self.pos += 1
+			if c == close:
+				return
+			if c != ',':
+				raise ValueError('Expected \',\' or {0!r} at offset {1}.'.format(close, self.tell() - 1))
+
+	def iterElements(self):
+		"""
+		Yields the text of each element of the array at the cursor, leaving the
+		cursor after the array.
+		"""
+		self.expect('[')
+		if self.peek() == ']':
+			self.pos += 1
+			return
+		while True:
+			yield self.readValue()
+			c = self.peek()
+			self.pos += 1
+			if c == ']':
+				return
+			if c != ',':
+				raise ValueError('Expected \',\' or \']\' at offset {0}.'.format(self.tell() - 1))
+
+	def _scanString(self, i):
+		"""
+		Returns the index just past the end of the string whose contents begin
+		at index 'i'.
+		"""
+		while True:
+			m = self._STRING_END.search(self.buffer, i)
+			if m is None or m.end() >= len(self.buffer) and m.group() == '\\':
+				if not self._fill():
+					raise ValueError('Unterminated string at offset {0}.'.format(self.tell()))
+				continue
+			if m.group() == '"':
+				return m.end()
+			i = m.end() + 1
+
+	def _scanContainer(self, i):
+		"""
+		Returns the index just past the end of the array or object that begins
+		at index 'i'.
+		"""
+		depth = 0
+		while True:
+			m = self._STRUCTURE.search(self.buffer, i)
+			if m is None:
+				if not self._fill():
+					raise ValueError('Unterminated value at offset {0}.'.format(self.tell()))
+				continue
+			c = m.group()
+			i = m.end()
+			if c == '"':
+				i = self._scanString(i)
+			elif c == '[' or c == '{':
+				depth += 1
+			else:
+				depth -= 1
+				if depth == 0:
+					return i
+
+	def _scanScalar(self, i):
+		"""
+		Returns the index just past the end of the number or literal that begins
+		at index 'i'.
+		"""
+		while True:
+			end = self._SCALAR.match(self.buffer, i).end()
+			if end < len(self.buffer) or not self._fill():
+				return end
+
+def _splitPath(expression):
+	"""
+	Turns a path given as a path expression into a list of keys and indexes.
+	"""
+	if expression is None or expression == '':
+		return []
+	if isinstance(expression, basestring):
+		steps = path(expression).steps
+	else:
+		steps = list(expression)
+	if _WILDCARD in steps:
+		raise ValueError('Wildcards cannot be used in {0!r}.'.format(expression))
+	return steps
+
+# -----------------------------------------------------------------------------
+# The offset index class
+# -----------------------------------------------------------------------------
+class OffsetIndex(object):
+	"""
+	An index of where each member of one large object or array in a JSON 
+	file, or each line of a JSON Lines file, begins and ends, as built by 
+	SafeJSONParser.indexFile.  Looking up a key or index decodes only the text
+	of that member, read from a memory map of the file, so lookups take the 
+	same time however large the file is.
+
+	Objects are looked up by key and arrays and JSON Lines files by position,
+	negative positions counting from the end.  As with SafeDict and SafeList,
+	members that are not there are returned as SafeNone.  The index keeps the
+	file mapped until it is closed, which a with statement does at its end.
+	"""
+	def __init__(self, parser, filename, keys, starts, ends):
+		self.parser = parser
+		self.filename = filename
+		self.keys = keys
+		self._positions = None if keys is None else dict((key, i) for i, key in enumerate(keys))
+		self._starts = starts
+		self._ends = ends
+		self._mmap = None
+		if len(starts):
+			with open(filename, 'rb') as f:
+				self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+	def __getitem__(self, key):
+		i = self._position(key)
+		if i is None:
+			return SafeNone
+		return self.parser.loads(self._mmap[self._starts[i]:self._ends[i]])
+
+	def get(self, key, default=None):
+		if self._position(key) is None:
+			return default
+		return self[key]
+
+	def __contains__(self, key):
+		return self._position(key) is not None
+
+	def __len__(self):
+		return len(self._starts)
+
+	def __iter__(self):
+		"""
+		Iterates over the keys of an indexed object, or decodes each element
+		of an indexed array or JSON Lines file in turn.
+		"""
+		if self.keys is not None:
+			return iter(self.keys)
+		return (self[i] for i in xrange(len(self)))
+
+	def _position(self, key):
+		"""
+		Returns the position in the index of the member 'key', or None if there
+		is no such member.
+		"""
+		if self._positions is not None:
+			return self._positions.get(key)
+		if type(key) != int and type(key) != long:
+			return None
+		if key < 0:
+			key += len(self._starts)
+		if 0 <= key < len(self._starts):
+			return key
+		return None
+
+	def close(self):
+		if self._mmap is not None:
+			self._mmap.close()
+			self._mmap = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def __repr__(self):
+		return 'OffsetIndex({0!r}, {1} {2})'.format(self.filename, len(self), 'elements' if self.keys is None else 'keys')
+
+def _indexOffsets(filename, path, lines, chunkSize):
+	"""
+	Scans 'filename' and returns the keys of the object at 'path', or None if
+	it is an array or 'lines' is True, with array('l')s of the offsets at 
+	which each member starts and ends.
+	"""
+	keys = None
+	starts = array.array('l')
+	ends = array.array('l')
+	with open(filename, 'rb') as f:
+		if lines:
+			offset = 0
+			for line in f:
+				text = line.strip()
+				if text:
+					start = offset + line.index(text[0])
+					starts.append(start)
+					ends.append(start + len(text))
+				offset += len(line)
+			return keys, starts, ends
+		stream = _JSONStream(f, chunkSize)
+		if not stream.seek(_splitPath(path)):
+			raise ValueError('There is no value at {0!r}.'.format(path))
+		c = stream.peek()
+		if c == '{':
+			keys = []
+		elif c != '[':
+			raise ValueError('The value at {0!r} is neither an object nor an array.'.format(path))
+		for key, start, end in stream.iterMembers():
+			if keys is not None:
+				keys.append(key)
+			starts.append(start)
+			ends.append(end)
+	return keys, starts, ends
+
+def _readIndex(indexPath, filename, path, lines):
+	"""
+	Returns the keys and offsets stored in the index file 'indexPath', or 
+	None if there is no index there, or it was built from another version of
+	'filename' or with other settings.
+	"""
+	try:
+		with open(indexPath, 'rb') as f:
+			data = marshal.load(f)
+		stat = os.stat(filename)
+		tag, size, mtime, indexedPath, indexedLines, keys, starts, ends = data
+	except (IOError, OSError, EOFError, ValueError, TypeError):
+		return None
+	if (tag, size, mtime, indexedPath, indexedLines) != (_INDEX_FORMAT, stat.st_size, stat.st_mtime, _splitPath(path), lines):
+		return None
+	return keys, array.array('l', starts), array.array('l', ends)
+
+def _writeIndex(indexPath, filename, path, lines, keys, starts, ends):
+	"""
+	Writes an index file, replacing any old one in a single step so that a
+	reader never sees half of one.  Files may be indexed where the index 
+	cannot be written, so failing to write it is not an error.
+	"""
+	stat = os.stat(filename)
+	data = marshal.dumps((_INDEX_FORMAT, stat.st_size, stat.st_mtime, _splitPath(path), lines, keys, starts.tostring(), ends.tostring()))
+	try:
+		fd, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(indexPath)))
+		with os.fdopen(fd, 'wb') as f:
+			f.write(data)
+		os.rename(temporary, indexPath)
+	except (IOError, OSError):
+		pass
+
+# Identifies the files written by _writeIndex
+_INDEX_FORMAT = 'safeJSON.index/1'
+
+# -----------------------------------------------------------------------------
+# Binary input
+# -----------------------------------------------------------------------------
+class _BufferReader(object):
+	"""
+	Gives a bytearray, memoryview or buffer the 'read' method of a file, so 
+	that the streaming readers can take them.  Only the chunk being read is 
+	copied.
+	"""
+	def __init__(self, data):
+		self.data = data
+		self.pos = 0
+
+	def read(self, size=-1):
+		end = len(self.data) if size < 0 else self.pos + size
+		chunk = _asString(self.data[self.pos:end])
+		self.pos += len(chunk)
+		return chunk
+
+	def tell(self):
+		return self.pos
+
+	def seek(self, pos):
+		self.pos = pos
+
+_BUFFERS = (bytearray, memoryview, buffer)
+
+def _asString(s):
+	"""
+	Returns the bytes in a bytearray, memoryview, buffer or mmap as a string,
+	or 's' itself if it is already a string.
+	"""
+	if isinstance(s, basestring):
+		return s
+	if isinstance(s, memoryview):
+		return s.tobytes()
+	if isinstance(s, mmap.mmap):
+		return s[:]
+	return str(s)
+
+def _asFile(f):
+	"""
+	Returns 'f' wrapped in a _BufferReader if it is a bytearray, memoryview or
+	buffer.  Files and mmaps already have a 'read' method.
+	"""
+	if isinstance(f, _BUFFERS):
+		return _BufferReader(f)
+	return f
+
+# -----------------------------------------------------------------------------
+# The decoder backends
+# -----------------------------------------------------------------------------
+class Backend(object):
+	"""
+	A JSON decoder that SafeJSONParser can parse documents with.  'decode' 
+	parses a string into plain dicts and lists.  If 'supportsHooks' is True it
+	also accepts the 'object_pairs_hook' argument of json.loads, which single 
+	pass decoding and interning rely on.
+
+	So that every backend accepts the same documents, a document that any 
+	backend other than 'json' rejects with a ValueError is parsed again with 
+	the json module, which either decodes it or raises its own error.  Some
+	decoders reject integers that do not fit in 64 bits, for example.
+
+	Backends are pickled by name, so a parser sent to another process uses 
+	the backend registered under the same name there.
+	"""
+	def __init__(self, name, decode, supportsHooks=False):
+		self.name = name
+		self.decode = decode
+		self.supportsHooks = supportsHooks
+
+	def loads(self, s, **kwargs):
+		if self.decode is json.loads:
+			return json.loads(s, **kwargs)
+		try:
+			return self.decode(s, **kwargs)
+		except ValueError:
+			return json.loads(s, **kwargs)
+
+	def __repr__(self):
+		return 'Backend({0!r})'.format(self.name)
+
+	def __reduce__(self):
+		return (getBackend, (self.name,))
+
+def registerBackend(name, decode, supportsHooks=False):
+	"""
+	Registers the decoder function 'decode' as a backend called 'name'.  
+	Backends registered this way are preferred to the built in ones when a 
+	parser chooses one automatically.  Parsers that have already chosen one,
+	including those behind the module level 'load' and 'loads', keep it.
+	"""
+	_backends[name] = Backend(name, decode, supportsHooks)
+	if name in _preference:
+		_preference.remove(name)
+	_preference.insert(0, name)
+
+def availableBackends():
+	"""
+	Returns the names of the installed backends, in the order they are 
+	preferred.
+	"""
+	return list(_preference)
+
+def getBackend(name=None):
+	"""
+	Returns the backend called 'name', or the preferred installed backend if
+	'name' is None.
+	"""
+	if name is None:
+		name = _preference[0]
+	if name not in _backends:
+		raise ValueError('Unknown backend {0!r}; the installed backends are {1}.'.format(name, ', '.join(_preference)))
+	return _backends[name]
+
+def _builtinBackends():
+	"""
+	Returns the backends for whichever of the supported decoders are 
+	installed, fastest first.  simplejson is only faster than json when its C
+	speedups are built, and is preferred after json when they are not.
+	"""
+	fast = []
+	slow = []
+	try:
+		import orjson
+		fast.append(Backend('orjson', orjson.loads))
+	except ImportError:
+		pass
+	try:
+		import ujson
+		# Without precise_float ujson rounds some floats differently to json
+		fast.append(Backend('ujson', lambda s: ujson.loads(s, precise_float=True)))
+	except ImportError:
+		pass
+	try:
+		import simplejson, simplejson.scanner
+		backend = Backend('simplejson', simplejson.loads, True)
+		if simplejson.scanner.c_make_scanner is not None:
+			fast.append(backend)
+		else:
+			slow.append(backend)
+	except ImportError:
+		pass
+	return fast + [Backend('json', json.loads, True)] + slow
+
+# The registered backends by name, and their names in order of preference
+_backends = {}
+_preference = []
+for _backend in _builtinBackends():
+	_backends[_backend.name] = _backend
+	_preference.append(_backend.name)
+del _backend
+
+# -----------------------------------------------------------------------------
+# The intern table class
+# -----------------------------------------------------------------------------
+class InternTable(object):
+	"""
+	A bounded table of strings used to share one copy of each object key and
+	short string value between every document a parser decodes, rather than
+	each document holding its own copies.  Pass one to SafeJSONParser as 
+	'internTable'.  A table may be shared by several parsers.
+
+	Only strings of at most 'maxLength' characters are interned.  Once the 
+	table holds 'maxSize' strings, new strings are returned as they are rather
+	than added, so the table never grows past that bound.  'hits' counts the 
+	strings that were replaced by a copy already in the table, and 'bytesSaved'
+	the memory those duplicates used.
+	"""
+	def __init__(self, maxSize=100000, maxLength=64):
+		self.maxSize = maxSize
+		self.maxLength = maxLength
+		self.hits = 0
+		self.misses = 0
+		self.bytesSaved = 0
+		self._table = {}
+
+	def intern(self, s):
+		"""
+		Returns the copy of the string 's' held in the table.
+		"""
+		if len(s) > self.maxLength:
+			return s
+		interned = self._table.get(s)
+		if interned is None:
+			if len(self._table) < self.maxSize:
+				self._table[s] = s
+			self.misses += 1
+			return s
+		if interned is not s:
+			self.hits += 1
+			self.bytesSaved += sys.getsizeof(s)
+		return interned
+
+	def clear(self):
+		"""
+		Empties the table and resets its counters.
+		"""
+		self._table.clear()
+		self.hits = 0
+		self.misses = 0
+		self.bytesSaved = 0
+
+	def __len__(self):
+		return len(self._table)
+
+	def __contains__(self, s):
+		return s in self._table
+
+	def __repr__(self):
+		return 'InternTable({0} strings, {1} hits, {2} bytes saved)'.format(len(self), self.hits, self.bytesSaved)
+
+	def __reduce__(self):
+		"""
+		Only the bounds of the table are pickled, so a parser sent to another 
+		process takes an empty table with it rather than a copy of this one.
+		"""
+		return (InternTable, (self.maxSize, self.maxLength))
+
 # -----------------------------------------------------------------------------
 # The safeJSON parser class
 # -----------------------------------------------------------------------------
@@ -418,29 +2218,1426 @@ class SafeJSONParser(object):
 	"""
 	Wrapper for json.load and json.loads that returns objets that have had 
 	their dictionaries and lists replaced by their 'Safe' equivalents.
+
+	By default the document is parsed into plain dicts and lists which are then
+	copied into their 'Safe' equivalents by 'transcode'.  If 'singlePass' is 
+	True the 'Safe' containers are instead built by the decoder itself as the 
+	document is parsed, so no intermediate tree of plain containers is created.
+
+	If 'lazy' is True nothing is converted at all.  The plain tree is returned
+	wrapped in a SafeDictView or SafeListView, which wrap nested containers only
+	as they are accessed.
+
+	If an InternTable is given as 'internTable', object keys and short string
+	values, in objects and arrays alike, are replaced by the copies held in 
+	the table as the document is decoded, so that documents decoded by the
+	parser share them.  This implies
+	'singlePass'.
+
+	If 'frozen' is True the parser returns FrozenSafeDicts and FrozenSafeLists,
+	which cannot be modified and can be hashed.  Lazy views are read only 
+	already, so 'frozen' has no effect on a lazy parser.
+
+	'backend' names the decoder to parse with (see availableBackends).  By 
+	default the fastest one installed is used.  Whichever backend is used the
+	result is the same.  Backends that do not support decoder hooks are used
+	for single pass decoding by transcoding what they return, but interning
+	needs the hooks, so it falls back to the json module with those backends.
+
+	If 'cacheSize' is more than zero the parser keeps the results of up to 
+	that many recent calls to 'loads' (and so 'load') without a projection,
+	and returns the cached result when it is given the same document again.
+	The least recently used results are evicted first, also when the cached
+	documents add up to more than 'cacheBytes' characters.  Cached results are
+	shared between callers, so a caching parser is always 'frozen'.  The cache
+	is safe to use from several threads.  See cacheInfo.
+
+	'schemas' is a list of the field names of objects that the documents hold
+	many of, as returned by inferSchemas.  Objects with exactly the fields of
+	one of the schemas, in any order, are decoded into records of the type 
+	returned by recordType, which need much less memory than SafeDicts.  Other
+	objects are still decoded into SafeDicts.  Records are built by the decoder
+	hooks, so 'schemas' implies 'singlePass'.  Records cannot be frozen, and 
+	lazy parsing and projections do not build them.
+
+	If 'compactArrays' is a number, arrays of at least that many numbers that
+	are all integers or all floats are decoded into SafeArrays, which store 
+	the numbers unboxed.  It is off by default because SafeArrays are not 
+	lists and only hold numbers of one type, so code that checks for lists 
+	or puts other values into the arrays must not use it; see SafeArray.  
+	SafeArrays cannot be frozen, and lazy parsing does not build them.
 	"""
-	def loads(self, s):
-		o = json.loads(s)
+	def __init__(self, singlePass=False, lazy=False, internTable=None, backend=None, frozen=False, cacheSize=0, cacheBytes=None, schemas=None, compactArrays=None):
+		self.singlePass = singlePass
+		self.lazy = lazy
+		self.internTable = internTable
+		self.backend = getBackend(backend)
+		self.frozen = frozen or cacheSize > 0
+		if self.frozen:
+			self._dictType, self._listType = FrozenSafeDict, FrozenSafeList
+		else:
+			self._dictType, self._listType = SafeDict, SafeList
+		self.cacheSize = cacheSize
+		self.cacheBytes = cacheBytes
+		self._cacheLock = threading.Lock()
+		self.clearCache()
+		self.schemas = None if schemas is None else [tuple(fields) for fields in schemas]
+		if self.schemas and self.frozen:
+			raise ValueError('Records cannot be frozen.')
+		self.compactArrays = compactArrays
+		if compactArrays is not None and self.frozen:
+			raise ValueError('SafeArrays cannot be frozen.')
+		self._compactLength = sys.maxsize if compactArrays is None else compactArrays
+		self._makeRecordTypes()
+
+	def __getstate__(self):
+		"""
+		The cache and its lock are left out when the parser is pickled, for
+		example to send it to loadsMany's workers.
+		"""
+		state = self.__dict__.copy()
+		for name in ('_cache', '_cacheLock', '_cacheHits', '_cacheMisses', '_cachedBytes', '_recordTypes', '_recordMatches'):
+			del state[name]
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._cacheLock = threading.Lock()
+		self.clearCache()
+		self._makeRecordTypes()
+
+	def cacheInfo(self):
+		"""
+		Returns the parser's cache statistics as a CacheInfo named tuple of 
+		hits, misses, the number of cached results and their maximum, and the 
+		characters of the cached documents and their maximum.
+		"""
+		with self._cacheLock:
+			return CacheInfo(self._cacheHits, self._cacheMisses, len(self._cache), self.cacheSize, self._cachedBytes, self.cacheBytes)
+
+	def clearCache(self):
+		"""
+		Empties the parser's cache and resets its statistics.
+		"""
+		with self._cacheLock:
+			self._cache = collections.OrderedDict()
+			self._cacheHits = 0
+			self._cacheMisses = 0
+			self._cachedBytes = 0
+
+	def loads(self, s, projection=None):
+		"""
+		Parses the JSON document in the string 's'.  's' may also be a 
+		bytearray, memoryview, buffer or mmap holding UTF-8 encoded JSON.  The
+		decoders need the document as one string, so these are copied into one
+		first.
+
+		If a 'projection' is given only the values it names are kept; everything 
+		else is discarded before any safe containers are built for it and so 
+		behaves as missing.  A projection is either a collection of path 
+		expressions such as 'results[*].name' (see SafePath), or a nested dict 
+		of field names such as {'results': {'name': True}}.  Naming a field keeps 
+		everything beneath it.  Arrays are projected element by element, so 
+		paths may not select individual array indexes.
+		"""
+		s = _asString(s)
+		if self.cacheSize > 0 and projection is None:
+			return self._cachedLoads(s)
+		return self._loads(s, projection)
+
+	def _cachedLoads(self, s):
+		"""
+		Returns the cached result for 's', parsing and caching it first if it 
+		is not in the cache.  The lock is not held while parsing, so two 
+		threads may both parse a document that neither finds in the cache.
+		"""
+		with self._cacheLock:
+			o = self._cache.pop(s, _MISSING)
+			if o is not _MISSING:
+				self._cache[s] = o
+				self._cacheHits += 1
+				return o
+			self._cacheMisses += 1
+		o = self._loads(s)
+		if self.cacheBytes is not None and len(s) > self.cacheBytes:
+			return o
+		with self._cacheLock:
+			if s not in self._cache:
+				self._cache[s] = o
+				self._cachedBytes += len(s)
+				while len(self._cache) > self.cacheSize or (self.cacheBytes is not None and self._cachedBytes > self.cacheBytes):
+					evicted, _ = self._cache.popitem(last=False)
+					self._cachedBytes -= len(evicted)
+		return o
+
+	def _loads(self, s, projection=None):
+		"""
+		Parses the string 's'.  See loads.
+		"""
+		if projection is not None:
+			o = self._loadsPlain(s)
+			if type(o) not in _CONTAINERS:
+				return o
+			return self._project(o, _compileProjection(projection))
+		if self.lazy:
+			return wrap(self._loadsPlain(s))
+		if self.internTable is not None or self._recordTypes:
+			o = self._hookBackend().loads(s, object_pairs_hook=self._safeObject)
+			return self._safeTop(o)
+		if self.singlePass and self.backend.supportsHooks:
+			o = self.backend.loads(s, object_pairs_hook=self._safeObject)
+			return self._safeTop(o)
+		o = self.backend.loads(s)
 		return self.transcode(o)
 
-	def load(self, f):
-		o = json.load(f)
-		return self.transcode(o)
+	def loadsWhere(self, s, test, default=None):
+		"""
+		Parses the string 's' and returns it if 'test', given the decoded 
+		value, returns True, or 'default' if it does not.  Where it can the 
+		value is tested as plain dicts and lists, and safe containers are only
+		built for values that pass, so 'test' must accept either.
+		"""
+		if self.internTable is not None or self._recordTypes:
+			o = self.loads(s)
+			return o if test(o) else default
+		o = self._loadsPlain(s)
+		if not test(o):
+			return default
+		return wrap(o) if self.lazy else self.transcode(o)
+
+	def load(self, f, projection=None):
+		"""
+		Parses the JSON document in the file 'f'.  See loads.
+		"""
+		return self.loads(f.read(), projection)
+
+	def loadPath(self, filename, projection=None):
+		"""
+		Parses the JSON document in the file called 'filename'.  The file is 
+		memory mapped and decoded from the mapping, so it is copied into memory
+		once rather than read through the file's buffers.  See loads.
+		"""
+		with open(filename, 'rb') as f:
+			if os.fstat(f.fileno()).st_size == 0:
+				return self.loads('', projection)
+			m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		try:
+			return self.loads(m, projection)
+		finally:
+			m.close()
+
+	def iterLoad(self, f, skipMalformed=False, chunkSize=65536, where=None):
+		"""
+		Returns an iterator over the records of a JSON Lines file, that is a file
+		holding one JSON document per line.  'f' may also be an mmap, or a 
+		bytearray, memoryview or buffer holding the file's contents.  If 
+		'where' is given only the records it selects are returned; see 
+		RecordFilter.  See SafeJSONLinesReader.
+		"""
+		return SafeJSONLinesReader(self, _asFile(f), skipMalformed, chunkSize, where)
+
+	def iterArray(self, f, path=None, chunkSize=65536, where=None):
+		"""
+		Yields the elements of the array found at 'path' in the JSON document in
+		'f' one at a time, without reading the whole document into memory.  Only
+		one element of the array is held in memory at a time.  'path' is either
+		a sequence of object keys and array indexes, or a path expression such
+		as 'response.results' (see SafePath) without wildcards.  If it is None 
+		the document itself must be an array.  Nothing is yielded if the path
+		is missing.  A negative index counts from the end of its array, which 
+		means reading that array twice, so 'f' must then be able to seek.  As
+		with iterLoad, 'f' may also be an mmap or a bytes-like
+		object, and 'where' selects the elements to yield.  Iterating over an
+		mmap of a file lets the operating system page the file in and out as 
+		it is read.
+		"""
+		recordFilter = _recordFilter(where)
+		stream = _JSONStream(_asFile(f), chunkSize)
+		if not stream.seek(_splitPath(path)):
+			return
+		if stream.peek() != '[':
+			raise ValueError('The value at {0!r} is not an array.'.format(path))
+		for text in stream.iterElements():
+			if recordFilter is None:
+				yield self.loads(text)
+				continue
+			o = recordFilter.apply(self, text)
+			if o is not _SKIPPED:
+				yield o
+
+	def indexFile(self, filename, path=None, lines=False, indexPath=None):
+		"""
+		Returns an OffsetIndex of the members of the object or array at 'path'
+		in the JSON file 'filename', or of the lines of the JSON Lines file 
+		'filename' if 'lines' is True.  'path' is given as for iterArray.  
+		Values looked up through the index are decoded by this parser.
+
+		Building the index means scanning the whole file once, though nothing
+		is decoded, so the index is saved in the file 'indexPath', by default
+		the name of the file with '.index' added.  Later calls read the saved
+		index instead, unless the file has changed since.
+		"""
+		if indexPath is None:
+			indexPath = filename + '.index'
+		offsets = _readIndex(indexPath, filename, path, lines)
+		if offsets is None:
+			offsets = _indexOffsets(filename, path, lines, 65536)
+			_writeIndex(indexPath, filename, path, lines, *offsets)
+		return OffsetIndex(self, filename, *offsets)
+
+	def loadsMany(self, strings, processes=None, chunkSize=None, pool=None, where=None):
+		"""
+		Parses each of 'strings' in a pool of worker processes and returns the
+		results in the same order.  The strings are sent to the workers in 
+		chunks of 'chunkSize' to amortize the cost of passing them between
+		processes.  By default each worker is sent four chunks.  An existing 
+		multiprocessing pool may be passed as 'pool', otherwise a pool of 
+		'processes' workers is created for the call.
+
+		If 'where' is given only the results it selects are returned, and 
+		rejected strings are never sent back from the workers.  A function 
+		given as 'where' has to be picklable.  The counts of a RecordFilter 
+		given as 'where' include the strings the workers scanned.
+
+		The parsed results have to be pickled to get them back from the workers,
+		which costs about as much as parsing them, so this only pays off when
+		there are spare cores to run the workers on.
+		"""
+		strings = list(strings)
+		if not strings:
+			return []
+		if chunkSize is None:
+			workers = processes or multiprocessing.cpu_count()
+			chunkSize = max(1, -(-len(strings) // (workers * 4)))
+		recordFilter = _recordFilter(where)
+		chunks = [(self, strings[i:i + chunkSize], recordFilter) for i in xrange(0, len(strings), chunkSize)]
+		ownPool = pool is None
+		if ownPool:
+			pool = multiprocessing.Pool(processes)
+		try:
+			results = []
+			for chunk, counts in pool.imap(_loadsChunk, chunks):
+				results.extend(chunk)
+				if recordFilter is not None:
+					recordFilter.add(counts)
+			return results
+		finally:
+			if ownPool:
+				pool.close()
+				pool.join()
+
+	def loadsAsync(self, s, callback=None, pool=None, threshold=65536):
+		"""
+		Parses 's' without blocking the calling thread, for use from event 
+		loops.  Returns an object with the interface of multiprocessing's 
+		AsyncResult: 'ready' says whether parsing has finished and 'get' 
+		returns the result.  If 'callback' is given it is called with the 
+		result when parsing finishes, on the thread that parsed it.
+
+		Strings shorter than 'threshold' are cheaper to parse than to hand off,
+		so they are parsed straight away and the callback is called before this
+		returns.  Longer strings are parsed by 'pool', which may be any 
+		multiprocessing pool.  By default a shared pool of one thread is used.
+		The json module holds the interpreter lock while it scans, so a thread 
+		cannot stop the decoding from delaying the loop, but it does let the
+		loop run between documents and while the safe containers are built.
+		"""
+		if len(s) < threshold:
+			try:
+				result = _CompletedResult(self.loads(s))
+			except Exception as e:
+				return _CompletedResult(error=e)
+			if callback is not None:
+				callback(result.get())
+			return result
+		if pool is None:
+			pool = _threadPool()
+		return pool.apply_async(_loadsOne, (self, s), callback=callback)
+
+	def lineFeed(self, skipMalformed=False, where=None):
+		"""
+		Returns a push parser for JSON Lines data that arrives in pieces, such
+		as from a socket.  See SafeJSONLinesFeed.
+		"""
+		return SafeJSONLinesFeed(self, skipMalformed, where)
+
+	def applyPatch(self, o, patch):
+		"""
+		Applies the JSON Patch (RFC 6902) 'patch' to the safe tree 'o' in place
+		and returns the patched tree, which is a new object only if the patch 
+		replaces the whole document.  'patch' is a list of operations, or the 
+		JSON text of one.  Values the patch adds are transcoded by this parser
+		and values it copies are deep copied, so the tree never shares 
+		containers with the patch.  Only the containers along the paths the 
+		operations name are visited, so the cost depends on the size of the 
+		patch, not of the tree.
+
+		'test' compares values as JSON does, so true and false are not the 
+		numbers 1 and 0.  If an operation fails, including a failed 'test', 
+		the operations already applied are undone and a ValueError is raised.  Frozen trees 
+		and lazy views cannot be patched, and records (see 'schemas') cannot
+		gain or lose fields.
+		"""
+		if isinstance(patch, basestring):
+			patch = json.loads(patch)
+		return _Patch(self, o).apply(patch)
+
+	def mergePatch(self, o, patch):
+		"""
+		Applies the JSON Merge Patch (RFC 7396) 'patch' to the safe tree 'o' in
+		place and returns the patched tree.  'patch' is an object whose keys 
+		replace those of 'o', recursively, with null meaning remove the key, 
+		or the JSON text of one.  A patch that is not an object replaces the 
+		whole tree, as does any patch if 'o' is not an object.  New values are
+		transcoded by this parser.
+
+		As with applyPatch, a patch that fails part way is undone and a 
+		ValueError is raised.  Records (see 'schemas') cannot gain or lose 
+		fields, so patches that add a field to a record or set one to null 
+		fail.
+		"""
+		if isinstance(patch, basestring):
+			patch = json.loads(patch)
+		return _Patch(self, o).merge(patch)
 
 	def transcode(self, o):
-		if type(o) == dict:
-			safeO = SafeDict()
-			for key, value in o.items():
-				safeO[key] = self.transcode(value)
-			return safeO
-		elif type(o) == list:
-			safeO = SafeList()
-			for value in o:
-				safeO.append(self.transcode(value))
-			return safeO
+		"""
+		Copies the plain dicts and lists in 'o' into SafeDicts and SafeLists, or
+		their frozen equivalents if the parser is frozen.
+
+		Rather than recursing into each nested container, pending containers 
+		are kept on two explicit stacks, one for objects and one for arrays, so 
+		that there is no limit on how deeply the document can be nested.  Each
+		container is copied whole and then only its dict and list values are 
+		replaced.  Values are replaced through the dict and list methods so 
+		that frozen containers can be filled in too.
+
+		Lists long enough to be compacted (see 'compactArrays') are tried as
+		SafeArrays first.  Nothing below a SafeArray needs copying.
+		"""
+		# Local names are faster to look up than globals in the loops below
+		plainDict, plainList, safeDict, safeList, typeOf = dict, list, self._dictType, self._listType, type
+		setDictItem, setListItem = dict.__setitem__, list.__setitem__
+		compactLength, compactArray = self._compactLength, _compactArray
+		dicts = []
+		lists = []
+		t = typeOf(o)
+		if t is plainDict:
+			safeO = safeDict(o)
+			dicts.append(safeO)
+		elif t is plainList:
+			safeO = compactArray(o) if compactLength <= len(o) else None
+			if safeO is None:
+				safeO = safeList(o)
+				lists.append(safeO)
 		else:
 			return o
+		while dicts or lists:
+			while dicts:
+				safe = dicts.pop()
+				for key, value in safe.iteritems():
+					t = typeOf(value)
+					if t is plainDict:
+						# Replacing the value of a key already in the dict is
+						# allowed while iterating over it
+						value = safeDict(value)
+						setDictItem(safe, key, value)
+						dicts.append(value)
+					elif t is plainList:
+						if compactLength <= len(value):
+							numbers = compactArray(value)
+							if numbers is not None:
+								setDictItem(safe, key, numbers)
+								continue
+						value = safeList(value)
+						setDictItem(safe, key, value)
+						lists.append(value)
+			while lists:
+				safe = lists.pop()
+				for i, value in enumerate(safe):
+					t = typeOf(value)
+					if t is plainDict:
+						value = safeDict(value)
+						setListItem(safe, i, value)
+						dicts.append(value)
+					elif t is plainList:
+						if compactLength <= len(value):
+							numbers = compactArray(value)
+							if numbers is not None:
+								setListItem(safe, i, numbers)
+								continue
+						value = safeList(value)
+						setListItem(safe, i, value)
+						lists.append(value)
+		return safeO
+
+	def _project(self, o, spec):
+		"""
+		Transcodes the parts of the plain object or array 'o' that are selected
+		by the compiled projection 'spec'.  Values that the projection descends
+		into but that are not objects or arrays are not selected.  In arrays 
+		they are replaced by SafeNone, so that the selected elements keep their
+		positions.  Like transcode, this keeps the containers still to be 
+		filled on a stack.
+		"""
+		stack = []
+		safeO = self._newProjection(o, spec, stack)
+		while stack:
+			o, safe, spec = stack.pop()
+			if type(o) == dict:
+				default = spec.get(_WILDCARD)
+				for key, value in o.iteritems():
+					fieldSpec = spec.get(key, default)
+					if fieldSpec is True:
+						dict.__setitem__(safe, key, self.transcode(value))
+					elif fieldSpec is not None and type(value) in _CONTAINERS:
+						dict.__setitem__(safe, key, self._newProjection(value, fieldSpec, stack))
+			else:
+				for value in o:
+					if type(value) in _CONTAINERS:
+						list.append(safe, self._newProjection(value, spec, stack))
+					else:
+						list.append(safe, SafeNone)
+		return safeO
+
+	def _newProjection(self, o, spec, stack):
+		"""
+		Returns the safe container that the projection of 'o' by 'spec' is
+		built in, pushing it on 'stack' to be filled unless the projection 
+		keeps everything.
+		"""
+		if type(o) == list:
+			spec = spec.get(_ELEMENTS) or spec.get(_WILDCARD, spec)
+			if spec is True:
+				return self.transcode(o)
+			safeO = self._listType()
+		else:
+			safeO = self._dictType()
+		stack.append((o, safeO, spec))
+		return safeO
+
+	def _loadsPlain(self, s):
+		"""
+		Parses 's' into plain dicts and lists, interning strings if the parser
+		has an intern table.
+		"""
+		if self.internTable is None:
+			return self.backend.loads(s)
+		o = self._hookBackend().loads(s, object_pairs_hook=self._internObject)
+		if type(o) == list:
+			self._internList(o)
+		return o
+
+	def _hookBackend(self):
+		"""
+		Returns the parser's backend if it supports decoder hooks, or the json
+		module's otherwise.
+		"""
+		if self.backend.supportsHooks:
+			return self.backend
+		return _backends['json']
+
+	def _safeObject(self, pairs):
+		"""
+		Decoder hook that builds a SafeDict straight from the key / value pairs
+		of a JSON object.  Nested objects have already been built by the time
+		this is called, but the decoder has no hook for arrays, so any list
+		values are converted here.
+		"""
+		if self.internTable is not None:
+			self._internPairs(pairs)
+		for i, (key, value) in enumerate(pairs):
+			if type(value) == list:
+				pairs[i] = (key, self._safeList(value))
+		if self._recordTypes and len(pairs) in self._recordTypes:
+			return self._record(pairs)
+		return self._dictType(pairs)
+
+	def _makeRecordTypes(self):
+		"""
+		Sets up the record types for the parser's schemas.  '_recordTypes' maps
+		the number of fields to the record types with that many, by their set
+		of fields.  '_recordMatches' caches what _record finds for each order
+		of keys.
+		"""
+		self._recordTypes = {}
+		self._recordMatches = {}
+		for fields in self.schemas or ():
+			self._recordTypes.setdefault(len(fields), {})[frozenset(fields)] = recordType(fields)
+
+	def _record(self, pairs):
+		"""
+		Builds a record from the key / value 'pairs' of an object if they match
+		one of the parser's schemas, or a SafeDict if they do not.
+		"""
+		keys = tuple([key for key, value in pairs])
+		try:
+			cls, order = self._recordMatches[keys]
+		except KeyError:
+			cls = self._recordTypes[len(keys)].get(frozenset(keys))
+			order = None
+			if cls is not None and keys != cls._fields:
+				order = [keys.index(field) for field in cls._fields]
+			if len(self._recordMatches) >= _MAX_RECORD_MATCHES:
+				self._recordMatches.clear()
+			self._recordMatches[keys] = cls, order
+		if cls is None:
+			return self._dictType(pairs)
+		if order is None:
+			return cls(*[value for key, value in pairs])
+		return cls(*[pairs[i][1] for i in order])
+
+	def _internObject(self, pairs):
+		"""
+		Decoder hook that builds a plain dict with its strings interned.
+		"""
+		return dict(self._internPairs(pairs))
+
+	def _internPairs(self, pairs):
+		"""
+		Replaces the keys and string values in the list of key / value 'pairs'
+		with their interned copies, as well as the strings in arrays among the
+		values.
+		"""
+		intern = self.internTable.intern
+		for i, (key, value) in enumerate(pairs):
+			if isinstance(value, basestring):
+				pairs[i] = (intern(key), intern(value))
+			else:
+				if type(value) == list:
+					self._internList(value)
+				pairs[i] = (intern(key), value)
+		return pairs
+
+	def _internList(self, l):
+		"""
+		Replaces the strings in the list 'l', and in any lists nested directly
+		inside of it, with their interned copies.  Objects in the lists have 
+		been interned by the decoder hook already.
+		"""
+		intern = self.internTable.intern
+		lists = [l]
+		while lists:
+			l = lists.pop()
+			for i, value in enumerate(l):
+				if isinstance(value, basestring):
+					l[i] = intern(value)
+				elif type(value) == list:
+					lists.append(value)
+
+	def _safeList(self, l):
+		"""
+		Converts a list produced by the decoder, and any lists nested directly
+		inside of it, into SafeLists, or SafeArrays where they can be.
+		"""
+		safeL = self._compactList(l)
+		if safeL is not None:
+			return safeL
+		safeL = self._listType(l)
+		lists = [safeL]
+		while lists:
+			safe = lists.pop()
+			for i, value in enumerate(safe):
+				if type(value) == list:
+					numbers = self._compactList(value)
+					if numbers is not None:
+						list.__setitem__(safe, i, numbers)
+						continue
+					value = self._listType(value)
+					list.__setitem__(safe, i, value)
+					lists.append(value)
+		return safeL
+
+	def _compactList(self, l):
+		"""
+		Returns the list 'l' as a SafeArray if it is long enough to compact and
+		holds only integers or only floats, or None otherwise.
+		"""
+		if self._compactLength <= len(l):
+			return _compactArray(l)
+		return None
+
+	def _safeTop(self, o):
+		"""
+		The decoder hook never sees the top level value, so a top level array
+		still needs interning and converting.
+		"""
+		if type(o) == list:
+			if self.internTable is not None:
+				self._internList(o)
+			return self._safeList(o)
+		return o
+
+_CONTAINERS = (dict, list)
+
+# The most orders of keys a parser remembers the matching record type of
+_MAX_RECORD_MATCHES = 1024
+
+def _compileProjection(projection):
+	"""
+	Turns a projection given to SafeJSONParser.loads into a nested dict mapping
+	each kept key to either True, meaning keep everything, or the projection of 
+	its value.  A _WILDCARD key applies to every key of an object, or to every
+	element of an array.  See _mergeWildcards.
+	"""
+	return _mergeWildcards(_specOf(projection))
+
+def _specOf(projection):
+	"""
+	Builds the nested dict of a projection, before wildcards are merged.
+	"""
+	if isinstance(projection, dict):
+		spec = {}
+		for key, value in projection.iteritems():
+			if key == '*':
+				key = _WILDCARD
+			spec[key] = _specOf(value) if isinstance(value, dict) else True
+		return spec
+	spec = {}
+	for expression in projection:
+		steps = path(expression).steps
+		if [step for step in steps if type(step) == int]:
+			raise ValueError('Projections cannot select array indexes: {0!r}.'.format(expression))
+		node = spec
+		for i, step in enumerate(steps):
+			if node is True:
+				break
+			if i == len(steps) - 1:
+				node[step] = True
+			else:
+				node = node.setdefault(step, {})
+	return spec
+
+def _mergeWildcards(spec):
+	"""
+	Merges the wildcard of each level of 'spec' into the keys named beside
+	it, so that an object's key is projected by both.  The elements of an 
+	array are projected by the wildcard and the named keys together, which
+	is kept under _ELEMENTS.
+	"""
+	stack = [spec]
+	while stack:
+		node = stack.pop()
+		if node is True or _ELEMENTS in node:
+			continue
+		wildcard = node.get(_WILDCARD)
+		if wildcard is not None and len(node) > 1:
+			named = dict((key, value) for key, value in node.iteritems() if key is not _WILDCARD)
+			for key in named:
+				node[key] = _mergeSpecs(node[key], wildcard)
+			node[_ELEMENTS] = _mergeSpecs(named, wildcard)
+			stack.append(node[_ELEMENTS])
+		stack.extend(value for key, value in node.iteritems() if key is not _ELEMENTS)
+	return spec
+
+def _mergeSpecs(a, b):
+	"""
+	Returns a projection that selects everything either 'a' or 'b' selects.
+	"""
+	if a is True or b is True:
+		return True
+	merged = dict(a)
+	for key, value in b.iteritems():
+		merged[key] = _mergeSpecs(merged[key], value) if key in merged else value
+	return merged
+
+# The key of a compiled projection's spec for the elements of an array
+_ELEMENTS = object()
+
+def _loadsChunk(args):
+	"""
+	Worker function for SafeJSONParser.loadsMany.  It lives at module level so
+	that it can be pickled.
+	"""
+	parser, strings, recordFilter = args
+	if recordFilter is None:
+		return [parser.loads(s) for s in strings], None
+	recordFilter = RecordFilter(recordFilter.where, recordFilter.prefilter)
+	results = [recordFilter.apply(parser, s) for s in strings]
+	return [o for o in results if o is not _SKIPPED], recordFilter.counts()
+
+# The statistics returned by SafeJSONParser.cacheInfo
+CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses', 'size', 'maxSize', 'bytes', 'maxBytes'])
+
+# Marks a document that is not in a parser's cache
+_MISSING = object()
+
+def _loadsOne(parser, s):
+	"""
+	Worker function for SafeJSONParser.loadsAsync.  It lives at module level so
+	that process pools can pickle it.
+	"""
+	return parser.loads(s)
+
+class _CompletedResult(object):
+	"""
+	The result of a call to SafeJSONParser.loadsAsync that was parsed straight
+	away, with the interface of multiprocessing's AsyncResult.
+	"""
+	def __init__(self, value=None, error=None):
+		self._value = value
+		self._error = error
+
+	def ready(self):
+		return True
+
+	def successful(self):
+		return self._error is None
+
+	def wait(self, timeout=None):
+		pass
+
+	def get(self, timeout=None):
+		if self._error is not None:
+			raise self._error
+		return self._value
+
+# The thread pool SafeJSONParser.loadsAsync uses by default, created when it is
+# first needed
+_pool = None
+_poolLock = threading.Lock()
+
+def _threadPool():
+	global _pool
+	with _poolLock:
+		if _pool is None:
+			_pool = multiprocessing.pool.ThreadPool(1)
+		return _pool
+
+# -----------------------------------------------------------------------------
+# JSON Patch
+# -----------------------------------------------------------------------------
+class _Patch(object):
+	"""
+	Applies one JSON Patch or JSON Merge Patch to a tree for 
+	SafeJSONParser.applyPatch and mergePatch, keeping a log of how to undo 
+	each change so that a patch that fails part way leaves the tree as it 
+	was.
+	"""
+	def __init__(self, parser, o):
+		self.parser = parser
+		self.root = o
+		self.undo = []
+
+	def apply(self, patch):
+		try:
+			for i, operation in enumerate(patch):
+				try:
+					self._apply(operation)
+				except (KeyError, IndexError, TypeError, ValueError) as e:
+					raise ValueError('Operation {0} of the patch failed: {1}'.format(i, e))
+		except:
+			self._rollBack()
+			raise
+		return self.root
+
+	def merge(self, patch):
+		"""
+		Applies the JSON Merge Patch 'patch' for SafeJSONParser.mergePatch.
+		"""
+		try:
+			try:
+				self._merge(unwrap(patch))
+			except (KeyError, IndexError, TypeError, ValueError) as e:
+				raise ValueError('The merge patch failed: {0}'.format(e))
+		except:
+			self._rollBack()
+			raise
+		return self.root
+
+	def _merge(self, patch):
+		if not _isObject(patch) or not _isObject(self.root):
+			self._add([], self._merged(patch))
+			return
+		stack = [(self.root, patch)]
+		while stack:
+			target, patch = stack.pop()
+			for key, value in patch.iteritems():
+				value = unwrap(value)
+				if value is None or value is SafeNone:
+					if key in target:
+						self._delete(target, key)
+				elif _isObject(value) and key in target and _isObject(target[key]):
+					stack.append((target[key], value))
+				else:
+					self._set(target, key, self._merged(value))
+
+	def _merged(self, value):
+		"""
+		Returns what merging 'value' into something that is not an object 
+		gives, ready to be put in the tree: 'value' itself, less the null 
+		members of its objects.
+		"""
+		if not _isObject(value):
+			return _patchValue(self.parser, value)
+		merged = {}
+		stack = [(value, merged)]
+		while stack:
+			source, target = stack.pop()
+			for key, value in source.iteritems():
+				value = unwrap(value)
+				if value is None or value is SafeNone:
+					continue
+				if _isObject(value):
+					target[key] = {}
+					stack.append((value, target[key]))
+				else:
+					target[key] = _patchValue(self.parser, value)
+		return self.parser.transcode(merged)
+
+	def _apply(self, operation):
+		op = operation['op']
+		tokens = _parsePointer(operation['path'])
+		if op == 'add':
+			self._add(tokens, _patchValue(self.parser, self._value(operation)))
+		elif op == 'remove':
+			self._remove(tokens)
+		elif op == 'replace':
+			if tokens:
+				self._remove(tokens)
+			self._add(tokens, _patchValue(self.parser, self._value(operation)))
+		elif op == 'move':
+			source = _parsePointer(operation['from'])
+			if tokens[:len(source)] == source and tokens != source:
+				raise ValueError('{0!r} cannot be moved into itself.'.format(operation['from']))
+			self._add(tokens, self._remove(source))
+		elif op == 'copy':
+			self._add(tokens, copy.deepcopy(self._get(_parsePointer(operation['from']))))
+		elif op == 'test':
+			value = unwrap(self._value(operation))
+			if not _jsonEqual(self._get(tokens), value):
+				raise ValueError('The value at {0!r} is not {1!r}.'.format(operation['path'], value))
+		else:
+			raise ValueError('Unknown operation {0!r}.'.format(op))
+
+	def _value(self, operation):
+		if 'value' not in operation:
+			raise ValueError('The operation has no value.')
+		return operation['value']
+
+	def _get(self, tokens):
+		"""
+		Returns the value that 'tokens' point to, raising a ValueError if there
+		is none.
+		"""
+		o = self.root
+		for token in tokens:
+			o, key = self._step(o, token)
+			if (key not in o) if _isObject(o) else (key >= len(o)):
+				raise ValueError('Nothing at {0!r}.'.format(_formatPointer(tokens)))
+			o = o[key]
+		return o
+
+	def _step(self, o, token, append=False):
+		"""
+		Returns the container 'o' and the key or index 'token' names in it.
+		"""
+		if _isObject(o):
+			return o, token
+		if not _isArray(o):
+			raise ValueError('{0!r} is neither an object nor an array.'.format(o))
+		if append and token == '-':
+			return o, len(o)
+		if not _ARRAY_INDEX.match(token):
+			raise ValueError('{0!r} is not an array index.'.format(token))
+		return o, int(token)
+
+	def _add(self, tokens, value):
+		if not tokens:
+			self.undo.append(('root', self.root))
+			self.root = value
+			return
+		o, key = self._step(self._get(tokens[:-1]), tokens[-1], append=True)
+		if _isObject(o):
+			self._set(o, key, value)
+		elif key > len(o):
+			raise ValueError('Index {0} is past the end of the array.'.format(key))
+		else:
+			o.insert(key, value)
+			self.undo.append(('delete', o, key))
+
+	def _remove(self, tokens):
+		"""
+		Removes the value 'tokens' point to and returns it.
+		"""
+		if not tokens:
+			raise ValueError('The whole document cannot be removed.')
+		value = self._get(tokens)
+		o, key = self._step(self._get(tokens[:-1]), tokens[-1])
+		if _isObject(o):
+			self._delete(o, key)
+		else:
+			del o[key]
+			self.undo.append(('insert', o, key, value))
+		return value
+
+	def _set(self, o, key, value):
+		"""
+		Sets the member 'key' of the object 'o', logging how to undo it.
+		"""
+		change = ('set', o, key, o[key]) if key in o else ('delete', o, key)
+		o[key] = value
+		self.undo.append(change)
+
+	def _delete(self, o, key):
+		"""
+		Removes the member 'key' of the object 'o', logging how to undo it.
+		"""
+		value = o[key]
+		del o[key]
+		self.undo.append(('set', o, key, value))
+
+	def _rollBack(self):
+		while self.undo:
+			change = self.undo.pop()
+			if change[0] == 'root':
+				self.root = change[1]
+			elif change[0] == 'set':
+				change[1][change[2]] = change[3]
+			elif change[0] == 'delete':
+				del change[1][change[2]]
+			else:
+				change[1].insert(change[2], change[3])
+
+def _isObject(o):
+	return isinstance(o, (dict, SafeRecord))
+
+def _isArray(o):
+	return isinstance(o, (list, SafeArray))
+
+def _parsePointer(pointer):
+	"""
+	Turns a JSON Pointer (RFC 6901) such as '/results/0/name' into a list of
+	its unescaped reference tokens.
+	"""
+	if pointer == '':
+		return []
+	if not isinstance(pointer, basestring) or not pointer.startswith('/'):
+		raise ValueError('Invalid JSON Pointer {0!r}.'.format(pointer))
+	return [token.replace('~1', '/').replace('~0', '~') for token in pointer.split('/')[1:]]
+
+def _formatPointer(tokens):
+	return ''.join('/' + unicode(token).replace('~', '~0').replace('/', '~1') for token in tokens)
+
+# The reference tokens that index an array
+_ARRAY_INDEX = re.compile(r'(0|[1-9][0-9]*)\Z')
+
+def _patchValue(parser, value):
+	"""
+	Returns a value taken from a patch ready to be put in a tree: transcoded
+	if it is plain, or deep copied if it is already safe.
+	"""
+	value = unwrap(value)
+	if value is SafeNone:
+		return None
+	if type(value) in _CONTAINERS:
+		return parser.transcode(value)
+	if isinstance(value, (dict, list, SafeRecord, SafeArray)):
+		return copy.deepcopy(value)
+	return value
+
+# -----------------------------------------------------------------------------
+# The safeJSON encoder class
+# -----------------------------------------------------------------------------
+class SafeJSONEncoder(json.JSONEncoder):
+	"""
+	A json.JSONEncoder that writes SafeNone as 'null' and encodes lazy views as
+	the plain containers underneath them.  SafeDicts and SafeLists are dicts 
+	and lists, so the encoder handles them directly and no copy of the tree is
+	made.
+
+	If 'skipSafeNone' is True, object members whose value is SafeNone are left
+	out altogether.  SafeNone elements of arrays are still written as 'null', 
+	since leaving them out would shift the indexes of the elements after them.
+
+	'iterencode' yields the document in pieces.  Objects and arrays with more 
+	than _STREAM_ITEMS values are encoded one value at a time, and anything 
+	smaller is encoded in one piece, so that the size of each piece is bounded 
+	without giving up the speed of the C encoder for small values.  With 
+	'skipSafeNone' or an 'indent' every object and array is encoded one value at
+	a time, which is slower.  The remaining arguments are those of 
+	json.JSONEncoder.
+	"""
+	def __init__(self, skipSafeNone=False, **kwargs):
+		super(SafeJSONEncoder, self).__init__(**kwargs)
+		self.skipSafeNone = skipSafeNone
+
+	def default(self, o):
+		if o is SafeNone:
+			return None
+		if isinstance(o, (SafeDictView, SafeListView)):
+			return o._o
+		if isinstance(o, SafeRecord):
+			return collections.OrderedDict(o.iteritems())
+		if isinstance(o, SafeArray):
+			return o.tolist()
+		return super(SafeJSONEncoder, self).default(o)
+
+	def encode(self, o):
+		if self.skipSafeNone or self.indent is not None:
+			return ''.join(self.iterencode(o))
+		try:
+			return super(SafeJSONEncoder, self).encode(o)
+		except RuntimeError:
+			if not self.check_circular:
+				raise
+			return ''.join(self._iterencode(o))
+
+	def iterencode(self, o, _one_shot=False):
+		if _one_shot:
+			return super(SafeJSONEncoder, self).iterencode(o, _one_shot)
+		return self._iterencode(o)
+
+	def _iterencode(self, o):
+		"""
+		Walks the objects and arrays that are streamed with an explicit stack.
+		Each stack frame holds the iterator over a container's values, whether
+		it is an object, and whether anything has been written for it yet.
+
+		Smaller containers are handed to the C encoder, which recurses.  If one
+		is nested too deeply for it, every container from there on is streamed
+		instead, so deep documents do not hit the recursion limit.  That needs
+		'check_circular', since without it a circular reference would be 
+		streamed forever; without it deep documents raise a RuntimeError as 
+		they do with the json module.
+		"""
+		streamAll = self.skipSafeNone or self.indent is not None
+		markers = {} if self.check_circular else None
+		stack = []
+		while True:
+			o = unwrap(o)
+			if isinstance(o, SafeRecord):
+				o = collections.OrderedDict(o.iteritems())
+			elif isinstance(o, SafeArray):
+				o = o.tolist()
+			if isinstance(o, (dict, list)) and (streamAll or len(o) > _STREAM_ITEMS):
+				if markers is not None:
+					if id(o) in markers:
+						raise ValueError('Circular reference detected')
+					markers[id(o)] = o
+				if isinstance(o, dict):
+					items = iter(sorted(o.iteritems())) if self.sort_keys else o.iteritems()
+					stack.append([items, o, True, False])
+					yield '{'
+				else:
+					stack.append([iter(o), o, False, False])
+					yield '['
+			else:
+				try:
+					text = self._encodeValue(o)
+				except RuntimeError:
+					if streamAll or markers is None or not isinstance(o, (dict, list)):
+						raise
+					streamAll = True
+					continue
+				yield text
+			while stack:
+				frame = stack[-1]
+				items, container, isObject, written = frame
+				for o in items:
+					if isObject:
+						key, o = o
+						if self.skipSafeNone and o is SafeNone:
+							continue
+						key = self._encodeKey(key)
+						if key is None:
+							continue
+						prefix = key + self.key_separator
+					else:
+						prefix = ''
+					if self.indent is not None:
+						prefix = '\n' + ' ' * (self.indent * len(stack)) + prefix
+					if written:
+						prefix = self.item_separator + prefix
+					frame[3] = True
+					yield prefix
+					break
+				else:
+					stack.pop()
+					if markers is not None:
+						del markers[id(container)]
+					end = '}' if isObject else ']'
+					if written and self.indent is not None:
+						end = '\n' + ' ' * (self.indent * len(stack)) + end
+					yield end
+					continue
+				break
+			else:
+				return
+
+	def _encodeKey(self, key):
+		"""
+		Encodes an object key the way json.JSONEncoder does, returning None for
+		keys that should be skipped.
+		"""
+		if isinstance(key, basestring):
+			return self._encodeValue(key)
+		if key is None or isinstance(key, (int, long, float)):
+			return self._encodeValue(self._encodeValue(key))
+		if self.skipkeys:
+			return None
+		raise TypeError('key {0!r} is not a string'.format(key))
+
+	def _encodeValue(self, o):
+		"""
+		Encodes a single value, handling the common scalars without setting up
+		the C encoder for each of them.
+		"""
+		if o is None or o is SafeNone:
+			return 'null'
+		if o is True:
+			return 'true'
+		if o is False:
+			return 'false'
+		if type(o) == int or type(o) == long:
+			return str(o)
+		return super(SafeJSONEncoder, self).encode(o)
+
+# Objects and arrays with more values than this are streamed by 'iterencode'
+# one value at a time.
+_STREAM_ITEMS = 64
+
+def dumps(o, skipSafeNone=False, **kwargs):
+	"""
+	Serializes 'o' to a JSON string, writing SafeNone as 'null'.  See 
+	SafeJSONEncoder.
+	"""
+	return SafeJSONEncoder(skipSafeNone=skipSafeNone, **kwargs).encode(o)
+
+def dump(o, f, skipSafeNone=False, chunkSize=65536, **kwargs):
+	"""
+	Serializes 'o' as JSON to the file 'f'.  Rather than building the whole 
+	string in memory the document is written in pieces of about 'chunkSize'
+	characters.  See SafeJSONEncoder.
+	"""
+	chunks = []
+	size = 0
+	for chunk in SafeJSONEncoder(skipSafeNone=skipSafeNone, **kwargs).iterencode(o):
+		chunks.append(chunk)
+		size += len(chunk)
+		if size >= chunkSize:
+			f.write(''.join(chunks))
+			chunks = []
+			size = 0
+	if chunks:
+		f.write(''.join(chunks))
+
+# -----------------------------------------------------------------------------
+# Compact serialization
+# -----------------------------------------------------------------------------
+def pack(o):
+	"""
+	Serializes the safe tree 'o' into a compact string that 'unpack' turns
+	back into the same tree, for sending documents between processes.  
+	Unpacking makes SafeNone the module's own SafeNone again, so 'x is 
+	SafeNone' still holds, a frozen tree unpacks frozen, and records and 
+	SafeArrays unpack as records and SafeArrays of the same types.
+
+	The tree is copied into plain containers and written with the marshal 
+	module.  SafeNone is replaced by Ellipsis, and records and SafeArrays by
+	tagged tuples, none of which JSON can produce.  That is several times 
+	faster than pickling SafeDicts, which pickle has to handle one at a time
+	in Python.  As with marshal, the result can only be read by the same 
+	version of Python, and the tree may only hold the types JSON decodes to.
+	marshal also cannot write trees nested more than about 2000 levels deep,
+	and packing one raises a ValueError.
+	"""
+	plain, restore = _toPlain(o)
+	frozen = type(o) in (FrozenSafeDict, FrozenSafeList)
+	try:
+		return marshal.dumps((_PACK_FORMAT, frozen, restore, plain))
+	except ValueError as e:
+		raise ValueError('The tree cannot be packed: {0}.'.format(e))
+
+def unpack(data):
+	"""
+	Rebuilds the safe tree packed into 'data' by 'pack'.  'data' may be a 
+	string, a bytes-like object or an mmap.
+	"""
+	try:
+		packFormat, frozen, restore, plain = marshal.loads(_asString(data))
+	except (EOFError, TypeError, ValueError):
+		raise ValueError('The data was not written by safeJSON.pack.')
+	if packFormat != _PACK_FORMAT:
+		raise ValueError('The data was not written by safeJSON.pack.')
+	parser = SafeJSONParser(frozen=frozen)
+	o = parser.transcode(plain)
+	if restore:
+		o = _restore(parser, o)
+	return o
+
+class SharedDocument(object):
+	"""
+	A handle to a safe tree published in shared memory by 'share'.  The handle
+	itself is tiny, so it can be passed to other processes, for example as an
+	argument to pool workers, instead of pickling the whole tree for each of 
+	them.  Each process calls 'get' to rebuild the tree from the packed copy
+	in shared memory.  Python objects cannot themselves live in shared 
+	memory, so every process still builds its own tree, but only from the
+	compact packed form.
+
+	The shared copy lasts until 'unlink' is called, which the process that
+	shared the tree should do once every reader is done with it.  Used in a 
+	with statement, the handle unlinks itself at the end.
+	"""
+	def __init__(self, path, size):
+		self.path = path
+		self.size = size
+
+	def get(self):
+		"""
+		Returns a new copy of the shared tree.
+		"""
+		with open(self.path, 'rb') as f:
+			m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		try:
+			return unpack(m)
+		finally:
+			m.close()
+
+	def unlink(self):
+		"""
+		Frees the shared copy of the tree.
+		"""
+		if os.path.exists(self.path):
+			os.remove(self.path)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.unlink()
+
+	def __repr__(self):
+		return 'SharedDocument({0!r}, {1})'.format(self.path, self.size)
+
+def share(o, directory=None):
+	"""
+	Packs the safe tree 'o' into shared memory and returns a SharedDocument 
+	handle to it.  Python 2 has no multiprocessing.shared_memory, so the tree 
+	is written to a file in 'directory', which by default is /dev/shm where it
+	exists.  There the file is held in memory and never written to disk.  
+	Elsewhere the system's temporary directory is used and the operating 
+	system's page cache does the sharing.
+	"""
+	data = pack(o)
+	if directory is None:
+		directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+	fd, path = tempfile.mkstemp(prefix='safeJSON-', suffix='.packed', dir=directory)
+	with os.fdopen(fd, 'wb') as f:
+		f.write(data)
+	return SharedDocument(path, len(data))
+
+# Identifies the layout of the tuple written by pack
+_PACK_FORMAT = 'safeJSON.pack/2'
+
+# The first items of the tuples pack writes records and SafeArrays as
+_PACKED_RECORD = 'record'
+_PACKED_ARRAY = 'array'
+
+def _plainCopy(o):
+	"""
+	Returns a plain copy of the safe container or view 'o', Ellipsis for 
+	SafeNone, and anything else as it is.  Records are copied into a tuple 
+	of _PACKED_RECORD, their fields and a list of their values, and 
+	SafeArrays into a tuple of _PACKED_ARRAY, their type code and their 
+	bytes.
+	"""
+	if o is SafeNone:
+		return Ellipsis
+	o = unwrap(o)
+	if isinstance(o, dict):
+		return dict(o)
+	if isinstance(o, SafeRecord):
+		return (_PACKED_RECORD, o._fields, list(o.itervalues()))
+	if isinstance(o, SafeArray):
+		return (_PACKED_ARRAY, o.typecode, o.tostring())
+	if isinstance(o, list):
+		return list(o)
+	return o
+
+def _toPlain(o):
+	"""
+	Copies the safe tree 'o' into plain dicts, lists and tuples for pack.  
+	Returns the copy and whether it holds anything unpack must restore: 
+	SafeNones, records or SafeArrays.
+	"""
+	plain = _plainCopy(o)
+	restore = plain is Ellipsis or type(plain) == tuple
+	stack = [plain] if type(plain) in _CONTAINERS else []
+	if type(plain) == tuple and plain[0] == _PACKED_RECORD:
+		stack.append(plain[2])
+	while stack:
+		container = stack.pop()
+		items = container.iteritems() if type(container) == dict else enumerate(container)
+		for key, value in items:
+			if type(value) in _SCALARS:
+				continue
+			copied = _plainCopy(value)
+			if copied is Ellipsis:
+				restore = True
+			elif type(copied) in _CONTAINERS:
+				stack.append(copied)
+			elif type(copied) == tuple:
+				restore = True
+				if copied[0] == _PACKED_RECORD:
+					stack.append(copied[2])
+			if copied is not value:
+				container[key] = copied
+	return plain, restore
+
+def _restore(parser, o):
+	"""
+	Replaces the Ellipses in the safe tree 'o' that 'parser' transcoded with 
+	SafeNone, and the tuples _plainCopy writes with the records and 
+	SafeArrays they hold, in place.  Returns the tree, which is only a new 
+	object if 'o' itself was replaced.
+	"""
+	o = _restoreValue(parser, o)
+	stack = [o] if isinstance(o, _CONTAINERS + (SafeRecord,)) else []
+	while stack:
+		container = stack.pop()
+		if isinstance(container, dict):
+			items, setItem = container.iteritems(), dict.__setitem__
+		elif isinstance(container, SafeRecord):
+			items, setItem = container.iteritems(), SafeRecord.__setitem__
+		else:
+			items, setItem = enumerate(container), list.__setitem__
+		for key, value in items:
+			if value is Ellipsis or type(value) == tuple:
+				value = _restoreValue(parser, value)
+				setItem(container, key, value)
+			if isinstance(value, _CONTAINERS + (SafeRecord,)):
+				stack.append(value)
+	return o
+
+def _restoreValue(parser, value):
+	"""
+	Returns the value _plainCopy wrote as 'value' for _restore.  The values
+	of records are transcoded, but not yet restored themselves.
+	"""
+	if value is Ellipsis:
+		return SafeNone
+	if type(value) != tuple:
+		return value
+	if value[0] == _PACKED_ARRAY:
+		a = SafeArray(value[1])
+		a.fromstring(value[2])
+		return a
+	return recordType(value[1])(*parser.transcode(value[2]))
+
+# The types JSON scalars decode to, which pack copies as they are
+_SCALARS = frozenset([unicode, str, int, long, float, bool, type(None)])
 
 # Put the load / loads module in the global scope
 load  = SafeJSONParser().load
-loads = SafeJSONParser().loads
\ No newline at end of file
+loadPath = SafeJSONParser().loadPath
+loads = SafeJSONParser().loads
+iterLoad = SafeJSONParser().iterLoad
+iterArray = SafeJSONParser().iterArray
+loadsAsync = SafeJSONParser().loadsAsync
+lineFeed = SafeJSONParser().lineFeed
+indexFile = SafeJSONParser().indexFile
+applyPatch = SafeJSONParser().applyPatch
+mergePatch = SafeJSONParser().mergePatch
+loadsMany = SafeJSONParser().loadsMany
\ No newline at end of file
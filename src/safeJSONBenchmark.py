@@ -0,0 +1,766 @@
+"""
+Benchmarks for safeJSON.
+
+The 'corpora' benchmark decodes a set of synthetic corpora (wide flat objects,
+deeply nested documents, large numeric arrays, many small JSON Lines records
+and documents shaped like the example in the README) with both the standard
+'json' module and safeJSON.  It times loads, load, transcode and nested access
+and reports throughput and peak memory for each.  The remaining benchmarks
+measure individual features of safeJSON.
+
+Every timed case is run in a freshly forked child process so that the peak
+memory reported for one case is not inflated by the garbage left behind by
+another.  Results are printed as a table and, with --json, also written to a
+file so that they can be compared across releases.  Run it from this
+directory:
+
+	python safeJSONBenchmark.py [--scale N] [--json FILE] [benchmark ...]
+"""
+import argparse, copy, cPickle, json, mmap, multiprocessing, os, platform, sys, tempfile, time, timeit
+import safeJSON
+
+# -----------------------------------------------------------------------------
+# Test documents
+# -----------------------------------------------------------------------------
+def makeResultsDocument(count):
+	"""
+	Builds a document shaped like the example in the README, with 'count'
+	results each holding a handful of child items.
+	"""
+	return {'results': [{
+		'id': i,
+		'name': 'result {0}'.format(i),
+		'tags': ['alpha', 'beta', 'gamma'],
+		'child_items': [{
+			'name': 'child item {0}'.format(j),
+			'values': [j, j + 1, j + 2]
+		} for j in range(5)]
+	} for i in range(count)]}
+
+def makeWideDocument(count):
+	"""
+	Builds a single flat object with 'count' fields.
+	"""
+	o = {}
+	for i in xrange(count):
+		o['field{0}'.format(i)] = i if i % 2 else 'value {0}'.format(i)
+	return o
+
+def makeDeepDocument(depth):
+	"""
+	Builds a document that alternates objects and arrays to 'depth' levels.
+	"""
+	o = {'leaf': True}
+	for i in xrange(depth / 2):
+		o = {'level': i, 'children': [o]}
+	return o
+
+def makeNumericDocument(count):
+	"""
+	Builds a document holding an array of 'count' floats and one of 'count'
+	integers.
+	"""
+	return {
+		'readings': [i * 0.25 for i in xrange(count)],
+		'counts': [i * 7 for i in xrange(count)]
+	}
+
+def makeRecord(i):
+	"""
+	Builds a small event record like those found in JSON Lines logs.
+	"""
+	return {
+		'id': i,
+		'type': ('click', 'view', 'purchase')[i % 3],
+		'user': {'id': i % 1000, 'name': 'user {0}'.format(i % 1000)},
+		'score': i * 0.5,
+		'tags': ['a', 'b']
+	}
+
+def accessWide(o):
+	return [o['field{0}'.format(i)] for i in xrange(0, len(o), 10)]
+
+def accessDeep(o):
+	while 'children' in o:
+		o = o['children'][0]
+	return o
+
+def accessNumeric(o):
+	return sum(o['readings']) + sum(o['counts'])
+
+def accessRecord(o):
+	return o['user']['id']
+
+def accessResults(o):
+	return [result['child_items'][0]['name'] for result in o['results']]
+
+class Corpus(object):
+	"""
+	A named list of JSON texts together with a function that reads some nested
+	values out of each parsed text.  A corpus holding more than one text is
+	stored on disk as JSON Lines.
+	"""
+	def __init__(self, name, docs, access):
+		self.name = name
+		self.texts = [json.dumps(doc) for doc in docs]
+		self.size = sum(len(text) for text in self.texts)
+		self.access = access
+
+	def write(self):
+		"""
+		Writes the corpus to a temporary file and returns its path.
+		"""
+		fd, path = tempfile.mkstemp(suffix='.json')
+		with os.fdopen(fd, 'w') as f:
+			f.write('\n'.join(self.texts))
+		return path
+
+def makeCorpora(scale):
+	return [
+		Corpus('wide', [makeWideDocument(int(100000 * scale))], accessWide),
+		Corpus('deep', [makeDeepDocument(400) for i in xrange(int(200 * scale))], accessDeep),
+		Corpus('numeric', [makeNumericDocument(int(200000 * scale))], accessNumeric),
+		Corpus('records', [makeRecord(i) for i in xrange(int(50000 * scale))], accessRecord),
+		Corpus('results', [makeResultsDocument(int(10000 * scale))], accessResults),
+	]
+
+# -----------------------------------------------------------------------------
+# Measurement
+# -----------------------------------------------------------------------------
+RESULTS = []
+
+def memoryKB(field):
+	"""
+	Reads a memory statistic of this process, in kilobytes, from /proc.
+	"""
+	with open('/proc/self/status') as f:
+		for line in f:
+			if line.startswith(field + ':'):
+				return int(line.split()[1])
+
+def runCase(fn, queue):
+	try:
+		before = memoryKB('VmRSS')
+		start = time.time()
+		fn()
+		wall = time.time() - start
+		queue.put((wall, memoryKB('VmHWM') - before))
+	except BaseException as e:
+		queue.put(e)
+		raise
+
+def measure(fn):
+	"""
+	Runs 'fn' in a child process and returns its wall time in seconds and
+	the growth of the child's peak resident set size in kilobytes.
+	"""
+	queue = multiprocessing.Queue()
+	process = multiprocessing.Process(target=runCase, args=(fn, queue))
+	process.start()
+	result = queue.get()
+	process.join()
+	if isinstance(result, BaseException):
+		raise result
+	return result
+
+def report(group, name, result, size=None, docs=None):
+	"""
+	Prints and records the result of a case measured by 'measure'.  If the
+	size of the input in bytes or the number of documents in it are given,
+	throughput is reported as well.
+	"""
+	wall, peakKB = result
+	record = {
+		'benchmark': group,
+		'case': name,
+		'seconds': wall,
+		'peakMB': peakKB / 1024.0
+	}
+	line = '{0:<36} {1:>9.3f} s {2:>9.1f} MB'.format(name, wall, peakKB / 1024.0)
+	if size is not None:
+		record['MBPerSecond'] = size / 1048576.0 / wall
+		line += ' {0:>9.1f} MB/s'.format(record['MBPerSecond'])
+	if docs is not None:
+		record['docsPerSecond'] = docs / wall
+		line += ' {0:>11.0f} docs/s'.format(record['docsPerSecond'])
+	RESULTS.append(record)
+	print line
+
+def reportTime(group, name, seconds, baseline=None):
+	"""
+	Prints and records a case that was timed in this process, optionally
+	relative to the time taken by a baseline.
+	"""
+	record = {'benchmark': group, 'case': name, 'seconds': seconds}
+	line = '{0:<36} {1:>9.3f} s'.format(name, seconds)
+	if baseline is not None:
+		record['relative'] = seconds / baseline
+		line += ' {0:>9.2f}x'.format(record['relative'])
+	RESULTS.append(record)
+	print line
+
+# -----------------------------------------------------------------------------
+# Benchmarks
+# -----------------------------------------------------------------------------
+def benchmarkCorpora(scale):
+	for corpus in makeCorpora(scale):
+		docs = len(corpus.texts)
+		print 'Corpus {0!r}: {1} documents, {2:.1f} MB'.format(corpus.name, docs, corpus.size / 1048576.0)
+		group = 'corpora.' + corpus.name
+		path = corpus.write()
+		texts = corpus.texts
+		access = corpus.access
+		def jsonLoad():
+			with open(path) as f:
+				if docs > 1:
+					return [json.loads(line) for line in f]
+				return json.load(f)
+		def safeLoad():
+			with open(path) as f:
+				if docs > 1:
+					return list(safeJSON.iterLoad(f))
+				return safeJSON.load(f)
+		report(group, 'json.loads', measure(lambda: [json.loads(t) for t in texts]), corpus.size, docs)
+		report(group, 'safeJSON.loads', measure(lambda: [safeJSON.loads(t) for t in texts]), corpus.size, docs)
+		report(group, 'json.load', measure(jsonLoad), corpus.size, docs)
+		report(group, 'safeJSON.load', measure(safeLoad), corpus.size, docs)
+
+		plain = [json.loads(t) for t in texts]
+		transcode = safeJSON.SafeJSONParser().transcode
+		report(group, 'transcode', measure(lambda: [transcode(o) for o in plain]), corpus.size, docs)
+		report(group, 'access (json)', measure(lambda: [access(o) for o in plain]), None, docs)
+		safe = [safeJSON.loads(t) for t in texts]
+		report(group, 'access (safeJSON)', measure(lambda: [access(o) for o in safe]), None, docs)
+		os.remove(path)
+
+def benchmarkSinglePass(scale):
+	count = int(20000 * scale)
+	print 'Decoding {0} results'.format(count)
+	s = json.dumps(makeResultsDocument(count))
+	twoPass = safeJSON.SafeJSONParser()
+	singlePass = safeJSON.SafeJSONParser(singlePass=True)
+	report('singlePass', 'json.loads', measure(lambda: json.loads(s)), len(s))
+	report('singlePass', 'loads (two pass)', measure(lambda: twoPass.loads(s)), len(s))
+	report('singlePass', 'loads (single pass)', measure(lambda: singlePass.loads(s)), len(s))
+
+def benchmarkLazy(scale):
+	count = int(20000 * scale)
+	print 'Reading a few fields from {0} results'.format(count)
+	s = json.dumps(makeResultsDocument(count))
+	eager = safeJSON.SafeJSONParser()
+	lazy = safeJSON.SafeJSONParser(lazy=True)
+	def readFields(parser):
+		o = parser.loads(s)
+		return [o['results'][i]['child_items'][0]['name'] for i in range(5)]
+	report('lazy', 'loads (eager)', measure(lambda: readFields(eager)), len(s))
+	report('lazy', 'loads (lazy)', measure(lambda: readFields(lazy)), len(s))
+
+def benchmarkIterLoad(scale):
+	for records in (int(20000 * scale), int(80000 * scale)):
+		print 'Streaming {0} JSON Lines records'.format(records)
+		fd, path = tempfile.mkstemp(suffix='.jsonl')
+		with os.fdopen(fd, 'w') as f:
+			record = json.dumps(makeResultsDocument(1)['results'][0])
+			for i in xrange(records):
+				f.write(record + '\n')
+		def readAll():
+			with open(path) as f:
+				for o in safeJSON.iterLoad(f):
+					pass
+		report('iterLoad', 'iterLoad ({0} records)'.format(records), measure(readAll), os.path.getsize(path), records)
+		os.remove(path)
+
+def benchmarkWhere(scale):
+	count = int(100000 * scale)
+	print 'Keeping the purchases among {0} JSON Lines records'.format(count)
+	fd, path = tempfile.mkstemp(suffix='.jsonl')
+	with os.fdopen(fd, 'w') as f:
+		for i in xrange(count):
+			f.write(json.dumps(makeRecord(i)) + '\n')
+	size = os.path.getsize(path)
+	def readAll():
+		with open(path) as f:
+			return [o for o in safeJSON.iterLoad(f) if o['type'] == 'purchase']
+	def readWhere(where, prefilter=True):
+		with open(path) as f:
+			return list(safeJSON.iterLoad(f, where=safeJSON.RecordFilter(where, prefilter)))
+	report('where', 'iterLoad, then filter', measure(readAll), size, count)
+	report('where', 'where (dict)', measure(lambda: readWhere({'type': 'purchase'})), size, count)
+	report('where', 'where (dict, no prefilter)', measure(lambda: readWhere({'type': 'purchase'}, False)), size, count)
+	report('where', 'where (function)', measure(lambda: readWhere(lambda o: o['type'] == 'purchase')), size, count)
+	os.remove(path)
+
+def benchmarkIterArray(scale):
+	count = int(20000 * scale)
+	print 'Reading the results array of a {0} result document'.format(count)
+	fd, path = tempfile.mkstemp(suffix='.json')
+	with os.fdopen(fd, 'w') as f:
+		json.dump(makeResultsDocument(count), f)
+	def loadAll():
+		with open(path) as f:
+			for o in safeJSON.load(f)['results']:
+				pass
+	def iterAll():
+		with open(path) as f:
+			for o in safeJSON.iterArray(f, 'results'):
+				pass
+	report('iterArray', 'load', measure(loadAll), os.path.getsize(path))
+	report('iterArray', 'iterArray', measure(iterAll), os.path.getsize(path))
+	os.remove(path)
+
+def benchmarkLoadsMany(scale):
+	count = int(20000 * scale)
+	print 'Decoding {0} payloads with loadsMany'.format(count)
+	record = json.dumps(makeResultsDocument(1)['results'][0])
+	strings = [record] * count
+	report('loadsMany', 'loads', measure(lambda: [safeJSON.loads(s) for s in strings]), None, count)
+	processes = 1
+	while processes <= max(2, multiprocessing.cpu_count()):
+		report('loadsMany', 'loadsMany ({0} processes)'.format(processes),
+			measure(lambda: safeJSON.loadsMany(strings, processes)), None, count)
+		processes *= 2
+
+def benchmarkPath(scale):
+	count = int(200000 * scale)
+	print 'Looking up a nested value {0} times'.format(count)
+	o = safeJSON.loads(json.dumps(makeResultsDocument(10)))
+	compiled = safeJSON.path('results[0].child_items[0].name')
+	chained = lambda: o['results'][0]['child_items'][0]['name']
+	baseline = timeit.timeit(chained, number=count)
+	reportTime('path', 'subscripts', baseline)
+	reportTime('path', 'SafePath.get', timeit.timeit(lambda: compiled.get(o), number=count), baseline)
+	docs = [o] * count
+	reportTime('path', 'SafePath.getMany', timeit.timeit(lambda: compiled.getMany(docs), number=1), baseline)
+
+def benchmarkColumns(scale):
+	count = int(200000 * scale)
+	print 'Extracting three columns from {0} records'.format(count)
+	records = safeJSON.loadsMany([json.dumps(makeRecord(i)) for i in xrange(count)])
+	paths = ['user.id', 'score', 'tags[0]']
+	def loop():
+		userIds, scores, tags = [], [], []
+		for record in records:
+			userIds.append(record['user']['id'])
+			scores.append(record['score'])
+			tags.append(record['tags'][0])
+		return userIds, scores, tags
+	baseline = min(timeit.repeat(loop, number=1, repeat=3))
+	reportTime('columns', 'subscripts into lists', baseline)
+	reportTime('columns', 'columns', min(timeit.repeat(lambda: safeJSON.columns(records, paths, useNumpy=False), number=1, repeat=3)), baseline)
+	reportTime('columns', 'columns with masks', min(timeit.repeat(lambda: safeJSON.columns(records, paths, masks=True, useNumpy=False), number=1, repeat=3)), baseline)
+	scores = loop()[1]
+	column = safeJSON.columns(records, ['score'], useNumpy=False)['score']
+	print '  score column: {0} bytes as a list of floats, {1} bytes as an array'.format(
+		sys.getsizeof(scores) + sum(sys.getsizeof(score) for score in scores),
+		sys.getsizeof(column))
+
+def benchmarkProjection(scale):
+	count = int(20000 * scale)
+	print 'Decoding the names of {0} results'.format(count)
+	s = json.dumps(makeResultsDocument(count))
+	report('projection', 'loads', measure(lambda: safeJSON.loads(s)), len(s))
+	report('projection', 'loads (projected)', measure(lambda: safeJSON.loads(s, ['results[*].name'])), len(s))
+
+def recursiveTranscode(o):
+	"""
+	The recursive transcoder that SafeJSONParser.transcode used to be, kept as
+	a baseline.
+	"""
+	if type(o) == dict:
+		safeO = safeJSON.SafeDict()
+		for key, value in o.items():
+			safeO[key] = recursiveTranscode(value)
+		return safeO
+	elif type(o) == list:
+		safeO = safeJSON.SafeList()
+		for value in o:
+			safeO.append(recursiveTranscode(value))
+		return safeO
+	else:
+		return o
+
+def benchmarkCompactArrays(scale):
+	count = int(1000000 * scale)
+	print 'Decoding arrays of {0} floats and {0} integers'.format(count)
+	text = json.dumps(makeNumericDocument(count))
+	for name, parser in [
+		('loads', safeJSON.SafeJSONParser()),
+		('loads (compact arrays)', safeJSON.SafeJSONParser(compactArrays=1000)),
+		('loads (compact arrays, single pass)', safeJSON.SafeJSONParser(compactArrays=1000, singlePass=True))
+	]:
+		report('compactArrays', name, measure(lambda: parser.loads(text)), len(text))
+	plain = safeJSON.loads(text)
+	compact = safeJSON.SafeJSONParser(compactArrays=1000).loads(text)
+	for key in ('readings', 'counts'):
+		print '  {0}: {1} bytes as a SafeList, {2} bytes as a SafeArray'.format(key,
+			sys.getsizeof(plain[key]) + sum(sys.getsizeof(value) for value in plain[key]),
+			sys.getsizeof(compact[key]))
+	baseline = timeit.timeit(lambda: sum(plain['readings']), number=10)
+	reportTime('compactArrays', 'sum (SafeList)', baseline)
+	reportTime('compactArrays', 'sum (SafeArray)', timeit.timeit(lambda: sum(compact['readings']), number=10), baseline)
+
+def benchmarkPatch(scale):
+	updates = 100
+	for count in (int(2000 * scale), int(20000 * scale)):
+		print 'Applying {0} small updates to a document of {1} results'.format(updates, count)
+		text = json.dumps(makeResultsDocument(count))
+		patches = [[
+			{'op': 'replace', 'path': '/results/{0}/name'.format(i * 7 % count), 'value': 'renamed {0}'.format(i)},
+			{'op': 'add', 'path': '/results/{0}/child_items/-'.format(i * 13 % count), 'value': {'name': 'added', 'values': [i]}}
+		] for i in xrange(updates)]
+		o = safeJSON.loads(text)
+		def reparse():
+			# Patch a plain copy of the document and parse it again, as one 
+			# would without applyPatch
+			current = text
+			for patch in patches:
+				plain = json.loads(current)
+				for operation in patch:
+					steps = operation['path'].split('/')[1:]
+					container = plain
+					for step in steps[:-1]:
+						container = container[int(step) if isinstance(container, list) else step]
+					if steps[-1] == '-':
+						container.append(operation['value'])
+					else:
+						container[steps[-1]] = operation['value']
+				current = json.dumps(plain)
+				safeJSON.loads(current)
+		baseline = timeit.timeit(reparse, number=1)
+		reportTime('patch', 'patch and reparse', baseline / updates)
+		seconds = timeit.timeit(lambda: [safeJSON.applyPatch(o, patch) for patch in patches], number=1) / updates
+		reportTime('patch', 'applyPatch', seconds, baseline / updates)
+		print '{0:<36} {1:>9.1f} us per update, {2:.0f} times faster'.format('', seconds * 1e6, baseline / updates / seconds)
+
+def benchmarkIntern(scale):
+	count = int(200000 * scale)
+	print 'Keeping {0} decoded records in memory'.format(count)
+	lines = [json.dumps(makeRecord(i)) for i in xrange(count)]
+	size = sum(len(line) for line in lines)
+	table = safeJSON.InternTable()
+	for name, parser in [
+		('loads', safeJSON.SafeJSONParser()),
+		('loads (single pass)', safeJSON.SafeJSONParser(singlePass=True)),
+		('loads (interned)', safeJSON.SafeJSONParser(internTable=table))
+	]:
+		result = measure(lambda: [parser.loads(line) for line in lines])
+		report('intern', name, result, size, count)
+		print '{0:<36} {1:>9.0f} bytes per record'.format('', result[1] * 1024.0 / count)
+	parser = safeJSON.SafeJSONParser(internTable=table)
+	for line in lines:
+		parser.loads(line)
+	print '{0:<36} {1:>9.1f} MB saved'.format('', table.bytesSaved / 1048576.0)
+
+def benchmarkRecords(scale):
+	count = int(200000 * scale)
+	print 'Keeping {0} decoded records in memory'.format(count)
+	lines = [json.dumps(makeRecord(i)) for i in xrange(count)]
+	size = sum(len(line) for line in lines)
+	schemas = safeJSON.inferSchemas([json.loads(line) for line in lines[:100]])
+	for name, parser in [
+		('loads', safeJSON.SafeJSONParser()),
+		('loads (single pass)', safeJSON.SafeJSONParser(singlePass=True)),
+		('loads (records)', safeJSON.SafeJSONParser(schemas=schemas)),
+		('loads (records, interned)', safeJSON.SafeJSONParser(schemas=schemas, internTable=safeJSON.InternTable()))
+	]:
+		result = measure(lambda: [parser.loads(line) for line in lines])
+		report('records', name, result, size, count)
+		print '{0:<36} {1:>9.0f} bytes per record'.format('', result[1] * 1024.0 / count)
+
+def loopLatency(submit, payloads, tick=0.001):
+	"""
+	Simulates an event loop that hands each of 'payloads' to 'submit' and then
+	runs a 'tick' second timer until every result is ready.  Returns the wall 
+	time, the number of ticks run and how late the worst and 99th percentile 
+	ticks fired.
+	"""
+	start = time.time()
+	results = [submit(s) for s in payloads]
+	lateness = []
+	while not all(result.ready() for result in results):
+		before = time.time()
+		time.sleep(tick)
+		lateness.append(time.time() - before - tick)
+	for result in results:
+		result.get()
+	lateness.sort()
+	if not lateness:
+		lateness = [time.time() - start]
+	return time.time() - start, len(lateness), lateness[-1], lateness[int(len(lateness) * 0.99)]
+
+def benchmarkAsync(scale):
+	count = int(3000 * scale)
+	payloads = [json.dumps(makeResultsDocument(count))] * 8
+	print 'Decoding {0} payloads of {1:.1f} MB while running a 1 ms timer'.format(len(payloads), len(payloads[0]) / 1048576.0)
+	processPool = multiprocessing.Pool(1)
+	for name, submit in [
+		('loads', lambda s: safeJSON.loadsAsync(s, threshold=len(s) + 1)),
+		('loadsAsync (threads)', lambda s: safeJSON.loadsAsync(s)),
+		('loadsAsync (processes)', lambda s: safeJSON.loadsAsync(s, pool=processPool))
+	]:
+		wall, ticks, worst, p99 = loopLatency(submit, payloads)
+		record = {'benchmark': 'async', 'case': name, 'seconds': wall, 'ticks': ticks, 'worstLateness': worst, 'p99Lateness': p99}
+		RESULTS.append(record)
+		print '{0:<36} {1:>9.3f} s {2:>7} ticks {3:>7.1f} ms worst {4:>7.1f} ms p99'.format(name, wall, ticks, worst * 1000, p99 * 1000)
+	processPool.close()
+	processPool.join()
+
+def benchmarkFrozen(scale):
+	count = int(20000 * scale)
+	print 'Decoding and copying {0} results'.format(count)
+	s = json.dumps(makeResultsDocument(count))
+	frozenParser = safeJSON.SafeJSONParser(frozen=True)
+	report('frozen', 'loads', measure(lambda: safeJSON.loads(s)), len(s))
+	report('frozen', 'loads (frozen)', measure(lambda: frozenParser.loads(s)), len(s))
+	safe = safeJSON.loads(s)
+	frozen = frozenParser.loads(s)
+	deepcopy = min(timeit.repeat(lambda: copy.deepcopy(safe), number=1, repeat=3))
+	reportTime('frozen', 'deepcopy', deepcopy)
+	reportTime('frozen', 'deepcopy (frozen)', min(timeit.repeat(lambda: copy.deepcopy(frozen), number=1, repeat=3)), deepcopy)
+	start = time.time()
+	hash(frozen)
+	reportTime('frozen', 'first hash (frozen)', time.time() - start, deepcopy)
+
+def benchmarkCache(scale):
+	calls = int(2000 * scale)
+	payloads = [json.dumps(makeResultsDocument(50 + i)) for i in xrange(20)]
+	print 'Decoding {0} payloads drawn from {1} distinct ones'.format(calls, len(payloads))
+	stream = [payloads[i % len(payloads)] for i in xrange(calls)]
+	size = sum(len(s) for s in stream)
+	for name, parser in [
+		('loads', safeJSON.SafeJSONParser()),
+		('loads (cacheSize=10)', safeJSON.SafeJSONParser(cacheSize=10)),
+		('loads (cacheSize=100)', safeJSON.SafeJSONParser(cacheSize=100))
+	]:
+		report('cache', name, measure(lambda: [parser.loads(s) for s in stream]), size, calls)
+
+def readShared(shared):
+	return len(shared.get())
+
+def readPickled(o):
+	return len(o)
+
+def benchmarkPack(scale):
+	count = int(20000 * scale)
+	print 'Serializing {0} results'.format(count)
+	safe = safeJSON.loads(json.dumps(makeResultsDocument(count)))
+	pickled = cPickle.dumps(safe, 2)
+	packed = safeJSON.pack(safe)
+	print '{0:<36} {1:>9.1f} MB pickled {2:>9.1f} MB packed'.format('', len(pickled) / 1048576.0, len(packed) / 1048576.0)
+	timings = [
+		('cPickle.dumps', lambda: cPickle.dumps(safe, 2)),
+		('pack', lambda: safeJSON.pack(safe)),
+		('cPickle.loads', lambda: cPickle.loads(pickled)),
+		('unpack', lambda: safeJSON.unpack(packed))
+	]
+	for name, fn in timings:
+		report('pack', name, measure(fn))
+	readers = 4
+	def sendToWorkers(worker, arg):
+		# The pool has to be created in the measured process, since its
+		# threads do not survive the fork
+		pool = multiprocessing.Pool(readers)
+		pool.map(worker, [arg] * readers)
+		pool.close()
+		pool.join()
+	with safeJSON.share(safe) as shared:
+		report('pack', 'pickle to {0} workers'.format(readers), measure(lambda: sendToWorkers(readPickled, safe)))
+		report('pack', 'share with {0} workers'.format(readers), measure(lambda: sendToWorkers(readShared, shared)))
+
+def benchmarkLoadPath(scale):
+	count = int(50000 * scale)
+	print 'Decoding a file of {0} results'.format(count)
+	fd, path = tempfile.mkstemp(suffix='.json')
+	with os.fdopen(fd, 'w') as f:
+		json.dump(makeResultsDocument(count), f)
+	size = os.path.getsize(path)
+	def iterMapped():
+		with open(path, 'rb') as f:
+			m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		for o in safeJSON.iterArray(m, 'results'):
+			pass
+		m.close()
+	def iterFile():
+		with open(path) as f:
+			for o in safeJSON.iterArray(f, 'results'):
+				pass
+	report('loadPath', 'load', measure(lambda: safeJSON.load(open(path))), size)
+	report('loadPath', 'loadPath', measure(lambda: safeJSON.loadPath(path)), size)
+	report('loadPath', 'iterArray (file)', measure(iterFile), size, count)
+	report('loadPath', 'iterArray (mmap)', measure(iterMapped), size, count)
+	os.remove(path)
+
+def benchmarkIndex(scale):
+	lookups = 1000
+	for count in (int(5000 * scale), int(50000 * scale)):
+		print 'Looking up {0} of {1} results in a file'.format(lookups, count)
+		fd, path = tempfile.mkstemp(suffix='.json')
+		with os.fdopen(fd, 'w') as f:
+			json.dump(makeResultsDocument(count), f)
+		start = time.time()
+		safeJSON.load(open(path))['results'][count / 2]
+		baseline = time.time() - start
+		reportTime('index', 'load (one lookup)', baseline)
+		start = time.time()
+		safeJSON.indexFile(path, 'results').close()
+		reportTime('index', 'indexFile (building)', time.time() - start, baseline)
+		start = time.time()
+		index = safeJSON.indexFile(path, 'results')
+		reportTime('index', 'indexFile (saved)', time.time() - start, baseline)
+		positions = [i * 7919 % count for i in xrange(lookups)]
+		seconds = timeit.timeit(lambda: [index[i] for i in positions], number=1)
+		reportTime('index', 'lookup', seconds / lookups, baseline)
+		print '{0:<36} {1:>9.1f} us per lookup'.format('', seconds / lookups * 1e6)
+		index.close()
+		os.remove(path)
+		os.remove(path + '.index')
+
+def benchmarkBackends(scale):
+	count = int(20000 * scale)
+	print 'Decoding {0} results with each installed backend'.format(count)
+	s = json.dumps(makeResultsDocument(count))
+	for name in safeJSON.availableBackends():
+		parser = safeJSON.SafeJSONParser(backend=name)
+		report('backends', 'loads ({0})'.format(name), measure(lambda: parser.loads(s)), len(s))
+
+def benchmarkTranscode(scale):
+	depth = 20000
+	count = int(200000 * scale)
+	print 'Transcoding a document {0} levels deep, one {1} fields wide and {2} results'.format(depth, count, count / 10)
+	transcode = safeJSON.SafeJSONParser().transcode
+	# The json module recurses once per level of nesting
+	limit = sys.getrecursionlimit()
+	sys.setrecursionlimit(depth + 1000)
+	try:
+		deep = makeDeepDocument(depth)
+		s = json.dumps(deep)
+		report('transcode', 'json.loads (deep)', measure(lambda: json.loads(s)), len(s))
+		report('transcode', 'safeJSON.loads (deep)', measure(lambda: safeJSON.loads(s)), len(s))
+		report('transcode', 'transcode (deep)', measure(lambda: transcode(deep)), len(s))
+	finally:
+		sys.setrecursionlimit(limit)
+	shallow = makeDeepDocument(500)
+	size = len(json.dumps(shallow))
+	report('transcode', 'recursive transcode (500 levels)', measure(lambda: recursiveTranscode(shallow)), size)
+	report('transcode', 'transcode (500 levels)', measure(lambda: transcode(shallow)), size)
+	for name, o in [('wide', makeWideDocument(count)), ('results', makeResultsDocument(count / 10))]:
+		size = len(json.dumps(o))
+		report('transcode', 'recursive transcode ({0})'.format(name), measure(lambda: recursiveTranscode(o)), size)
+		report('transcode', 'transcode ({0})'.format(name), measure(lambda: transcode(o)), size)
+
+def benchmarkDumps(scale):
+	count = int(20000 * scale)
+	print 'Encoding {0} results'.format(count)
+	plain = makeResultsDocument(count)
+	safe = safeJSON.loads(json.dumps(plain))
+	size = len(json.dumps(plain))
+	report('dumps', 'json.dumps', measure(lambda: json.dumps(plain)), size)
+	report('dumps', 'safeJSON.dumps', measure(lambda: safeJSON.dumps(safe)), size)
+	report('dumps', 'safeJSON.dumps (skipSafeNone)', measure(lambda: safeJSON.dumps(safe, skipSafeNone=True)), size)
+	report('dumps', 'json.dump', measure(lambda: json.dump(plain, open(os.devnull, 'w'))), size)
+	report('dumps', 'safeJSON.dump', measure(lambda: safeJSON.dump(safe, open(os.devnull, 'w'))), size)
+
+def benchmarkAccess(scale):
+	count = int(1000000 * scale)
+	print 'Cost of {0} subscripts relative to dict and list'.format(count)
+	plainDict = {'a': 1, 'b': 2}
+	plainList = [1, 2]
+	safeDict = safeJSON.SafeDict(plainDict)
+	safeList = safeJSON.SafeList(plainList)
+	def time(fn):
+		return min(timeit.repeat(fn, number=count, repeat=3))
+	dictCost = time(lambda: plainDict['a'])
+	listCost = time(lambda: plainList[1])
+	cases = [
+		('SafeDict hit', dictCost, lambda: safeDict['a']),
+		('SafeDict miss', dictCost, lambda: safeDict['c']),
+		('SafeList hit', listCost, lambda: safeList[1]),
+		('SafeList miss', listCost, lambda: safeList[5]),
+		('SafeList negative hit', listCost, lambda: safeList[-1]),
+	]
+	for name, baseline, fn in cases:
+		reportTime('access', name, time(fn), baseline)
+
+def benchmarkTelemetry(scale):
+	count = int(1000000 * scale)
+	print 'Cost of {0} subscripts with telemetry off and on'.format(count)
+	safeDict = safeJSON.SafeDict({'a': 1, 'b': 2})
+	safeList = safeJSON.SafeList([1, 2])
+	def time(fn):
+		return min(timeit.repeat(fn, number=count, repeat=3))
+	cases = [
+		('SafeDict hit', lambda: safeDict['a']),
+		('SafeDict miss', lambda: safeDict['c']),
+		('SafeList hit', lambda: safeList[1]),
+		('SafeList miss', lambda: safeList[5]),
+	]
+	baselines = dict((name, time(fn)) for name, fn in cases)
+	for sampleEvery in (None, 1, 100):
+		if sampleEvery is None:
+			safeJSON.enableTelemetry()
+			safeJSON.disableTelemetry()
+			label = 'off'
+		else:
+			safeJSON.enableTelemetry(sampleEvery)
+			label = 'every {0}'.format(sampleEvery)
+		for name, fn in cases:
+			reportTime('telemetry', '{0} ({1})'.format(name, label), time(fn), baselines[name])
+		safeJSON.disableTelemetry()
+
+BENCHMARKS = [
+	('corpora', benchmarkCorpora),
+	('singlePass', benchmarkSinglePass),
+	('lazy', benchmarkLazy),
+	('iterLoad', benchmarkIterLoad),
+	('where', benchmarkWhere),
+	('iterArray', benchmarkIterArray),
+	('loadsMany', benchmarkLoadsMany),
+	('path', benchmarkPath),
+	('projection', benchmarkProjection),
+	('columns', benchmarkColumns),
+	('backends', benchmarkBackends),
+	('frozen', benchmarkFrozen),
+	('cache', benchmarkCache),
+	('pack', benchmarkPack),
+	('loadPath', benchmarkLoadPath),
+	('index', benchmarkIndex),
+	('async', benchmarkAsync),
+	('transcode', benchmarkTranscode),
+	('compactArrays', benchmarkCompactArrays),
+	('intern', benchmarkIntern),
+	('records', benchmarkRecords),
+	('dumps', benchmarkDumps),
+	('patch', benchmarkPatch),
+	('access', benchmarkAccess),
+	('telemetry', benchmarkTelemetry),
+]
+
+if __name__ == '__main__':
+	names = [name for name, fn in BENCHMARKS]
+	parser = argparse.ArgumentParser(description='Benchmarks for safeJSON.')
+	parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+		help='The benchmarks to run, all of them by default: ' + ', '.join(names))
+	parser.add_argument('--scale', type=float, default=1.0,
+		help='Multiplies the size of every test document.')
+	parser.add_argument('--json', metavar='FILE',
+		help='Also write the results to FILE as JSON.')
+	args = parser.parse_args()
+	for name in args.benchmarks:
+		if name not in names:
+			parser.error('Unknown benchmark {0!r}.'.format(name))
+
+	for name, fn in BENCHMARKS:
+		if not args.benchmarks or name in args.benchmarks:
+			print
+			fn(args.scale)
+
+	if args.json:
+		with open(args.json, 'w') as f:
+			json.dump({
+				'python': platform.python_version(),
+				'platform': platform.platform(),
+				'cpus': multiprocessing.cpu_count(),
+				'scale': args.scale,
+				'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+				'results': RESULTS
+			}, f, indent=1, sort_keys=True)
@@ -1,4 +1,4 @@
-import unittest, logging, safeJSON, json, os, pickle
+import unittest, logging, safeJSON, copy, json, mmap, os, pickle, StringIO, tempfile
 from safeJSON import SafeNone
 
 
@@ -20,6 +20,16 @@ class TestSafeJSON(unittest.TestCase):
 			exceptionThrown = True
 		self.assertTrue(exceptionThrown, 'Expected access of non integer index to raise an exception.')
 
+		# test negative indexes and slices
+		l.extend(['b', 'c'])
+		self.assertTrue(l[-1] == 'c', "Expected negative indexes to count from the end of the list.")
+		self.assertTrue(l[-4] is SafeNone, "Expected list to return SafeNone for a negative index")
+		self.assertTrue(l[1:] == ['b', 'c'] and type(l[1:]) is safeJSON.SafeList, "Expected slices to be SafeLists.")
+		self.assertTrue(l[::2] == ['a', 'c'] and type(l[::2]) is safeJSON.SafeList, "Expected slices to be SafeLists.")
+		self.assertTrue(l[1:][5] is SafeNone, "Expected slices to return SafeNone")
+		del(l[-4])
+		del(l[1:])
+
 		# test delete
 		del(l[0])
 		self.assertTrue(l[0] is SafeNone, "Expected list to return SafeNone")		
@@ -175,6 +185,743 @@ class TestSafeJSON(unittest.TestCase):
 		safeJsonObject = safeJSON.load(open(os.sep.join(['testData','test.json'])))
 		self.doTestLoadLoads(testObject, safeJsonObject)
 
+	def testSinglePass(self):
+		logger.info("Testing single pass decoding")
+		parser = safeJSON.SafeJSONParser(singlePass=True)
+		testObject = json.load(open(os.sep.join(['testData','test.json'])))
+		safeJsonObject = parser.load(open(os.sep.join(['testData','test.json'])))
+		self.doTestLoadLoads(testObject, safeJsonObject)
+		safeJsonObject = parser.loads(json.dumps(testObject))
+		self.doTestLoadLoads(testObject, safeJsonObject)
+
+		safeJsonObject = parser.loads('[[1, [2, {"a": [[3]]}]], {}]')
+		self.assertTrue(type(safeJsonObject) is safeJSON.SafeList, "Expected top level array to be a SafeList.")
+		self.assertTrue(type(safeJsonObject[0][1]) is safeJSON.SafeList, "Expected nested array to be a SafeList.")
+		self.assertTrue(type(safeJsonObject[0][1][1]['a'][0]) is safeJSON.SafeList, "Expected nested array to be a SafeList.")
+		self.assertTrue(type(safeJsonObject[1]) is safeJSON.SafeDict, "Expected object to be a SafeDict.")
+		self.assertTrue(safeJsonObject[0][1][1]['a'][0][1] is SafeNone, "Expected to get a SafeNone object.")
+
+	def testLazy(self):
+		logger.info("Testing lazy views")
+		parser = safeJSON.SafeJSONParser(lazy=True)
+		testObject = json.load(open(os.sep.join(['testData','test.json'])))
+		safeJsonObject = parser.load(open(os.sep.join(['testData','test.json'])))
+		self.doTestLoadLoads(testObject, safeJsonObject)
+		self.assertTrue(type(safeJsonObject) is safeJSON.SafeDictView, "Expected a SafeDictView.")
+		self.assertTrue(type(safeJsonObject['testNested1']) is safeJSON.SafeListView, "Expected a SafeListView.")
+		self.assertTrue(type(safeJsonObject['testNested1'][0]) is safeJSON.SafeDictView, "Expected a SafeDictView.")
+		self.assertTrue(safeJsonObject['testArray'][1:] == ['item2', 3], "Expected slices of a view to compare equal to lists.")
+		self.assertTrue(safeJsonObject['testArray'][1:][5] is SafeNone, "Expected slices of a view to be safe.")
+		self.assertTrue(sorted(k for k, v in safeJsonObject.items()) == sorted(testObject.keys()), "Expected view items to match the original.")
+
+		# wrapping does not copy
+		self.assertTrue(safeJSON.unwrap(safeJSON.wrap(testObject)) is testObject, "Expected wrap to return a view of the original object.")
+		self.assertTrue(safeJSON.unwrap(safeJSON.wrap(testObject)['testNested2']) is testObject['testNested2'], "Expected nested views to share the original objects.")
+		self.assertTrue(safeJSON.wrap(5) == 5, "Expected wrap to leave scalars alone.")
+		safeDict = safeJSON.SafeDict()
+		self.assertTrue(safeJSON.wrap(safeDict) is safeDict, "Expected wrap to leave safe containers alone.")
+
+	def testIterLoad(self):
+		logger.info("Testing iterLoad")
+		lines = '{"a": [1, 2]}\n\n{"b": {"c": 3}}\n{not json}\n[4, 5]'
+		records = list(safeJSON.iterLoad(StringIO.StringIO(lines), skipMalformed=True))
+		self.assertTrue(records == [{'a': [1, 2]}, {'b': {'c': 3}}, [4, 5]], "Expected one record per well formed line.")
+		self.assertTrue(records[0]['a'][2] is SafeNone, "Expected records to be safe.")
+		self.assertTrue(records[1]['b']['d'] is SafeNone, "Expected records to be safe.")
+
+		# lines longer than a chunk are reassembled
+		reader = safeJSON.iterLoad(StringIO.StringIO(lines), skipMalformed=True, chunkSize=3)
+		self.assertTrue(list(reader) == records, "Expected the chunk size not to change the records read.")
+		self.assertTrue(reader.records == 3, "Expected 3 records to be read.")
+		self.assertTrue(reader.malformed == 1, "Expected 1 malformed line to be counted.")
+
+		exceptionRaised = False
+		try:
+			list(safeJSON.iterLoad(StringIO.StringIO(lines)))
+		except ValueError:
+			exceptionRaised = True
+		self.assertTrue(exceptionRaised, "Expected a malformed line to raise a ValueError.")
+
+	def testIterArray(self):
+		logger.info("Testing iterArray")
+		testObject = {
+			'meta' : {'skip' : ['a "quoted" ] string', {'b' : '}'}]},
+			'results' : [{'id' : i, 'name' : 'result\\\n{0}'.format(i), 'values' : [i, None, True, 1.5]} for i in range(20)],
+			'nested' : [[1, 2], [3, [4, 5]]]
+		}
+		jsonString = json.dumps(testObject)
+
+		# small chunks make values span several reads
+		for chunkSize in [1, 7, 65536]:
+			results = list(safeJSON.iterArray(StringIO.StringIO(jsonString), 'results', chunkSize))
+			self.assertTrue(results == testObject['results'], "Expected iterArray to yield every element of the array.")
+			self.assertTrue(results[0]['missing'] is SafeNone, "Expected elements to be safe.")
+			nested = list(safeJSON.iterArray(StringIO.StringIO(jsonString), ['nested', 1, 1], chunkSize))
+			self.assertTrue(nested == [4, 5], "Expected paths to be able to step through arrays.")
+			nested = list(safeJSON.iterArray(StringIO.StringIO(jsonString), 'nested[1][1]', chunkSize))
+			self.assertTrue(nested == [4, 5], "Expected path expressions to be accepted.")
+			nested = list(safeJSON.iterArray(StringIO.StringIO(jsonString), 'nested[-1][-1]', chunkSize))
+			self.assertTrue(nested == [4, 5] and list(safeJSON.iterArray(StringIO.StringIO(jsonString), ['nested', -2], chunkSize)) == [1, 2], "Expected negative indexes to count from the end.")
+
+		self.assertTrue(list(safeJSON.iterArray(StringIO.StringIO('[1, [2], {"a": 3}]'))) == [1, [2], {'a': 3}], "Expected a top level array to be read.")
+		self.assertTrue(list(safeJSON.iterArray(StringIO.StringIO(jsonString), 'meta.missing')) == [], "Expected a missing array to yield nothing.")
+		self.assertTrue(list(safeJSON.iterArray(StringIO.StringIO(jsonString), ['nested', 2])) == [], "Expected a missing array to yield nothing.")
+		self.assertTrue(list(safeJSON.iterArray(StringIO.StringIO(jsonString), ['nested', -3])) == [], "Expected a missing array to yield nothing.")
+		self.assertTrue(list(safeJSON.iterArray(bytearray(jsonString), 'nested[-1][-1]')) == [4, 5], "Expected negative indexes in buffers to count from the end.")
+
+		exceptionRaised = False
+		try:
+			list(safeJSON.iterArray(StringIO.StringIO(jsonString), 'meta'))
+		except ValueError:
+			exceptionRaised = True
+		self.assertTrue(exceptionRaised, "Expected a path to something other than an array to raise a ValueError.")
+
+	def testPickle(self):
+		logger.info("Testing pickling")
+		safeJsonObject = safeJSON.load(open(os.sep.join(['testData','test.json'])))
+		safeJsonObject['testSafeNone'] = SafeNone
+		for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+			copy = pickle.loads(pickle.dumps(safeJsonObject, protocol))
+			self.assertTrue(copy == safeJsonObject, "Expected a pickled object to survive unchanged.")
+			self.assertTrue(copy['testSafeNone'] is SafeNone, "Expected SafeNone to remain a singleton when unpickled.")
+			self.assertTrue(type(copy['testNested1']) is safeJSON.SafeList, "Expected SafeLists to be unpickled as SafeLists.")
+			self.assertTrue(copy['testNested1'][0]['missing'] is SafeNone, "Expected unpickled objects to be safe.")
+			view = pickle.loads(pickle.dumps(safeJSON.wrap({'a' : [1]}), protocol))
+			self.assertTrue(view['a'][1] is SafeNone, "Expected unpickled views to be safe.")
+
+	def testLoadsMany(self):
+		logger.info("Testing loadsMany")
+		strings = [json.dumps({'id' : i, 'items' : range(i)}) for i in range(25)]
+		results = safeJSON.loadsMany(strings, processes=2, chunkSize=3)
+		self.assertTrue(results == [json.loads(s) for s in strings], "Expected results in the order of the input.")
+		self.assertTrue(results[3]['items'][3] is SafeNone, "Expected the results to be safe.")
+		self.assertTrue(results[3]['missing'] is SafeNone, "Expected the results to be safe.")
+		self.assertTrue(safeJSON.loadsMany([]) == [], "Expected no input to give no results.")
+
+	def testPath(self):
+		logger.info("Testing paths")
+		testObject = {'results' : [
+			{'name' : 'result 1', 'child_items' : [{'name' : 'child 1'}, {'name' : 'child 2'}], 'a.b' : 1},
+			{'name' : 'result 2', 'child_items' : []},
+			{'child_items' : 'not a list'}
+		]}
+		safeJsonObject = safeJSON.loads(json.dumps(testObject))
+		for o in [testObject, safeJsonObject, safeJSON.wrap(testObject)]:
+			self.assertTrue(safeJSON.path('results[0].child_items[1].name').get(o) == 'child 2', "Expected a path to find the value.")
+			self.assertTrue(safeJSON.path('results[0].child_items[-1].name').get(o) == 'child 2', "Expected negative indexes to count from the end.")
+			self.assertTrue(safeJSON.path('results[0]["a.b"]').get(o) == 1, "Expected quoted keys to be matched.")
+			self.assertTrue(safeJSON.path('results[1].child_items[0].name').get(o) is SafeNone, "Expected a missing index to give SafeNone.")
+			self.assertTrue(safeJSON.path('results[2].child_items[0]').get(o) is SafeNone, "Expected strings not to be indexed.")
+			self.assertTrue(safeJSON.path('missing.child_items[0]').get(o) is SafeNone, "Expected a missing key to give SafeNone.")
+			self.assertTrue(safeJSON.path('results[*].name').get(o) == ['result 1', 'result 2'], "Expected wildcards to match every element.")
+			self.assertTrue(safeJSON.path('results[*].child_items[*].name').get(o) == ['child 1', 'child 2'], "Expected wildcards to match every element.")
+			self.assertTrue(safeJSON.path('results[0].child_items[0].*').get(o) == ['child 1'], "Expected wildcards to match every value.")
+
+		names = safeJSON.path('results[0].name').getMany([testObject, {}, safeJsonObject])
+		self.assertTrue(names == ['result 1', SafeNone, 'result 1'], "Expected getMany to evaluate the path on every document.")
+		self.assertTrue(names[1] is SafeNone, "Expected getMany to give SafeNone for missing values.")
+		self.assertTrue(safeJSON.path('results[0].name') is safeJSON.path('results[0].name'), "Expected compiled paths to be cached.")
+
+		for expression in ['a..b', 'a[', 'a[x]', 'a.']:
+			exceptionRaised = False
+			try:
+				safeJSON.path(expression)
+			except ValueError:
+				exceptionRaised = True
+			self.assertTrue(exceptionRaised, "Expected {0!r} to raise a ValueError.".format(expression))
+
+	def testProjection(self):
+		logger.info("Testing projections")
+		testObject = {
+			'results' : [
+				{'id' : 1, 'name' : 'result 1', 'child_items' : [{'name' : 'child 1', 'size' : 2}]},
+				{'id' : 2, 'name' : 'result 2', 'child_items' : [{'size' : 3}]}
+			],
+			'meta' : {'count' : 2}
+		}
+		jsonString = json.dumps(testObject)
+
+		expected = {'results' : [
+			{'name' : 'result 1', 'child_items' : [{'name' : 'child 1'}]},
+			{'name' : 'result 2', 'child_items' : [{}]}
+		]}
+		projections = [
+			['results[*].name', 'results[*].child_items[*].name'],
+			['results.name', 'results.child_items.name'],
+			{'results' : {'name' : True, 'child_items' : {'name' : True}}}
+		]
+		for projection in projections:
+			safeJsonObject = safeJSON.loads(jsonString, projection)
+			self.assertTrue(safeJsonObject == expected, "Expected only the projected fields to be kept.")
+			self.assertTrue(safeJsonObject['meta'] is SafeNone, "Expected fields outside the projection to be missing.")
+			self.assertTrue(safeJsonObject['results'][0]['id'] is SafeNone, "Expected fields outside the projection to be missing.")
+			self.assertTrue(type(safeJsonObject['results'][0]['child_items']) is safeJSON.SafeList, "Expected projected values to be safe.")
+
+		safeJsonObject = safeJSON.loads(jsonString, ['meta', 'results[*].*.name'])
+		self.assertTrue(safeJsonObject['meta'] == {'count' : 2}, "Expected a projected field to keep everything beneath it.")
+		self.assertTrue(safeJsonObject['results'][0] == {'child_items' : [{'name' : 'child 1'}]}, "Expected wildcards to match every key.")
+		safeJsonObject = safeJSON.loads('{"results": [null, {"name": "x", "id": 1}, 5]}', ['results[*].name'])
+		self.assertTrue(len(safeJsonObject['results']) == 3 and safeJsonObject['results'][1] == {'name': 'x'}, "Expected projected array elements to keep their positions.")
+		self.assertTrue(safeJsonObject['results'][0] is SafeNone and safeJsonObject['results'][2] is SafeNone, "Expected unselected array elements to be SafeNone.")
+		safeJsonObject = safeJSON.loads('{"meta": {"name": "n", "count": 1, "other": 2}, "more": {"name": "m", "count": 3}}', ['*.name', 'meta.count'])
+		self.assertTrue(safeJsonObject == {'meta': {'name': 'n', 'count': 1}, 'more': {'name': 'm'}}, "Expected wildcards to merge with named keys in objects.")
+		safeJsonObject = safeJSON.loads(jsonString, ['results[*].name', 'results.id'])
+		self.assertTrue(safeJsonObject['results'][1] == {'name': 'result 2', 'id': 2}, "Expected wildcards to merge with named keys in arrays.")
+		safeJsonObject = safeJSON.load(open(os.sep.join(['testData','test.json'])), ['testDict.dictKey1'])
+		self.assertTrue(safeJsonObject == {'testDict' : {'dictKey1' : 'dictVal1'}}, "Expected load to accept a projection.")
+
+		exceptionRaised = False
+		try:
+			safeJSON.loads(jsonString, ['results[0].name'])
+		except ValueError:
+			exceptionRaised = True
+		self.assertTrue(exceptionRaised, "Expected projections selecting array indexes to raise a ValueError.")
+
+	def testDeep(self):
+		logger.info("Testing deeply nested documents")
+		depth = 50000
+		testObject = leaf = {'leaf' : [1]}
+		for i in range(depth):
+			testObject = [{'a' : testObject}]
+		safeJsonObject = safeJSON.SafeJSONParser().transcode(testObject)
+		levels = 0
+		while type(safeJsonObject) is safeJSON.SafeList:
+			self.assertTrue(type(safeJsonObject[0]) is safeJSON.SafeDict, "Expected nested objects to be SafeDicts.")
+			safeJsonObject = safeJsonObject[0]['a']
+			levels += 1
+		self.assertTrue(levels == depth, "Expected every level to be transcoded.")
+		self.assertTrue(safeJsonObject == leaf and type(safeJsonObject['leaf']) is safeJSON.SafeList, "Expected the innermost object to be transcoded.")
+		self.assertTrue(safeJsonObject['missing'] is SafeNone, "Expected to get a SafeNone object.")
+
+	def testIntern(self):
+		logger.info("Testing interning")
+		table = safeJSON.InternTable(maxSize=4, maxLength=8)
+		parser = safeJSON.SafeJSONParser(internTable=table)
+		first = parser.loads('{"type" : "click", "name" : "a long name", "tags" : ["x"]}')
+		second = parser.loads('[{"type" : "click", "name" : "a long name"}]')[0]
+		self.assertTrue(first == {'type' : 'click', 'name' : 'a long name', 'tags' : ['x']}, "Expected interning to leave values unchanged.")
+		self.assertTrue(type(first) is safeJSON.SafeDict and type(first['tags']) is safeJSON.SafeList, "Expected interned objects to be safe.")
+		firstKeys = dict((key, key) for key in first)
+		for key in second:
+			self.assertTrue(firstKeys[key] is key, "Expected keys to be shared between documents.")
+		self.assertTrue(first['type'] is second['type'], "Expected short values to be shared between documents.")
+		self.assertTrue(first['name'] is not second['name'], "Expected long values not to be interned.")
+		self.assertTrue(len(table) == 4 and table.hits == 3 and table.bytesSaved > 0, "Expected the table to count what it saved.")
+
+		tagTable = safeJSON.InternTable()
+		for tagParser in (safeJSON.SafeJSONParser(internTable=tagTable), safeJSON.SafeJSONParser(internTable=tagTable, lazy=True)):
+			tagsA = tagParser.loads('[{"tags" : ["alpha", ["beta"]]}, "alpha"]')
+			tagsB = tagParser.loads('[{"tags" : ["alpha", ["beta"]]}, "alpha"]')
+			self.assertTrue(tagsA[0]['tags'][0] is tagsB[0]['tags'][0] and tagsA[0]['tags'][1][0] is tagsB[0]['tags'][1][0], "Expected strings in arrays to be shared between documents.")
+			self.assertTrue(tagsA[1] is tagsB[1], "Expected strings in a top level array to be shared between documents.")
+
+		parser.loads('{"more" : "strings"}')
+		self.assertTrue(len(table) == 4 and 'more' not in table, "Expected a full table not to grow.")
+
+		lazy = safeJSON.SafeJSONParser(lazy=True, internTable=table).loads('{"type" : "click"}')
+		self.assertTrue(list(lazy)[0] is firstKeys['type'], "Expected lazy parsers to intern keys.")
+		projected = safeJSON.SafeJSONParser(internTable=table).loads('{"type" : "click", "id" : 1}', ['type'])
+		self.assertTrue(projected['type'] is first['type'], "Expected projections to intern values.")
+		self.assertTrue(len(pickle.loads(pickle.dumps(table))) == 0, "Expected an unpickled table to be empty.")
+
+	def testBackends(self):
+		logger.info("Testing decoder backends")
+		documents = [
+			'{"a" : [1, 2.5, -3e10, true, false, null], "b" : {"c" : "d\\u00e9\\n"}, "e" : []}',
+			'[{"a" : {}}, [[1]], "string", 0.1, 123456789012345678901234567890]',
+			'"top level string"',
+			'17'
+		]
+		self.assertTrue('json' in safeJSON.availableBackends(), "Expected the json module to always be available.")
+		self.assertTrue(safeJSON.SafeJSONParser().backend is safeJSON.getBackend(safeJSON.availableBackends()[0]), "Expected the preferred backend to be the default.")
+
+		def rejectBigNumbers(s):
+			if '12345678901234567890' in s:
+				raise ValueError('Value is too big')
+			return json.loads(s)
+		safeJSON.registerBackend('noHooks', rejectBigNumbers)
+		try:
+			self.assertTrue(safeJSON.availableBackends()[0] == 'noHooks', "Expected registered backends to be preferred.")
+			for name in safeJSON.availableBackends():
+				for kwargs in [{}, {'singlePass' : True}, {'lazy' : True}, {'internTable' : safeJSON.InternTable()}]:
+					parser = safeJSON.SafeJSONParser(backend=name, **kwargs)
+					for document in documents:
+						expected = json.loads(document)
+						safeJsonObject = parser.loads(document)
+						self.assertTrue(safeJsonObject == expected, "Expected backend {0} with {1} to decode {2}.".format(name, kwargs, document))
+						if type(expected) == list and not kwargs.get('lazy'):
+							self.assertTrue(type(safeJsonObject) is safeJSON.SafeList and type(safeJsonObject[0]['a']) is safeJSON.SafeDict, "Expected backend {0} to build safe containers.".format(name))
+							self.assertTrue(safeJsonObject[1][0][5] is SafeNone, "Expected to get a SafeNone object.")
+					exceptionRaised = False
+					try:
+						parser.loads('{"a" : }')
+					except ValueError:
+						exceptionRaised = True
+					self.assertTrue(exceptionRaised, "Expected backend {0} to raise a ValueError for malformed documents.".format(name))
+				self.assertTrue(pickle.loads(pickle.dumps(parser)).backend.name == name, "Expected parsers to pickle their backend by name.")
+		finally:
+			del safeJSON._backends['noHooks']
+			safeJSON._preference.remove('noHooks')
+
+		exceptionRaised = False
+		try:
+			safeJSON.SafeJSONParser(backend='noSuchBackend')
+		except ValueError:
+			exceptionRaised = True
+		self.assertTrue(exceptionRaised, "Expected unknown backends to raise a ValueError.")
+
+	def testBinaryInput(self):
+		logger.info("Testing binary and memory mapped input")
+		fileName = os.sep.join(['testData','test.json'])
+		testObject = json.load(open(fileName))
+		jsonString = open(fileName).read()
+		for data in [bytearray(jsonString), memoryview(jsonString), buffer(jsonString)]:
+			self.doTestLoadLoads(testObject, safeJSON.loads(data))
+		self.doTestLoadLoads(testObject, safeJSON.loadPath(fileName))
+		self.assertTrue(safeJSON.loadPath(fileName, ['testDict.dictKey1']) == {'testDict' : {'dictKey1' : 'dictVal1'}}, "Expected loadPath to accept a projection.")
+		with open(fileName, 'rb') as f:
+			m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		self.doTestLoadLoads(testObject, safeJSON.loads(m))
+		self.assertTrue(list(safeJSON.iterArray(m, 'testNested1')) == testObject['testNested1'], "Expected iterArray to read from an mmap.")
+		m.close()
+
+		lines = bytearray('{"a" : 1}\n[2]\n')
+		self.assertTrue(list(safeJSON.iterLoad(lines, chunkSize=3)) == [{'a' : 1}, [2]], "Expected iterLoad to read from a bytearray.")
+		self.assertTrue(list(safeJSON.iterArray(memoryview('[1, {"b" : 2}]'), chunkSize=2)) == [1, {'b' : 2}], "Expected iterArray to read from a memoryview.")
+
+	def testAsync(self):
+		logger.info("Testing asynchronous loading")
+		jsonString = open(os.sep.join(['testData','test.json'])).read()
+		testObject = json.loads(jsonString)
+		results = []
+		for threshold in [len(jsonString) + 1, 0]:
+			result = safeJSON.loadsAsync(jsonString, callback=results.append, threshold=threshold)
+			self.doTestLoadLoads(testObject, result.get(5))
+			self.assertTrue(result.ready() and result.successful(), "Expected a finished result.")
+		self.assertTrue(len(results) == 2 and results[0] == results[1] == testObject, "Expected the callback to be called with each result.")
+
+		for threshold in [100, 0]:
+			result = safeJSON.loadsAsync('{"a" : ', threshold=threshold)
+			exceptionRaised = False
+			try:
+				result.get(5)
+			except ValueError:
+				exceptionRaised = True
+			self.assertTrue(exceptionRaised, "Expected malformed documents to raise a ValueError from get.")
+
+		feed = safeJSON.lineFeed()
+		records = []
+		for piece in ['{"a" : ', '1}\n\n[2', ']\n{"b"', bytearray(' : 3}')]:
+			records.extend(feed.feed(piece))
+		self.assertTrue(records == [{'a' : 1}, [2]], "Expected records to be returned as their lines end.")
+		records.extend(feed.close())
+		self.assertTrue(records == [{'a' : 1}, [2], {'b' : 3}] and feed.records == 3, "Expected close to return the last record.")
+		self.assertTrue(type(records[0]) is safeJSON.SafeDict, "Expected records to be safe.")
+
+		feed = safeJSON.lineFeed(skipMalformed=True)
+		self.assertTrue(feed.feed('{"a" : \n[1]\n') == [[1]] and feed.malformed == 1, "Expected malformed lines to be skipped.")
+
+	def testTelemetry(self):
+		logger.info("Testing missing field telemetry")
+		safeJsonObject = safeJSON.loads('{"a" : [1, {"b" : 2}]}')
+		view = safeJSON.SafeJSONParser(lazy=True).loads('{"a" : [1]}')
+		originals = [safeJSON.SafeDict.__missing__, safeJSON.SafeList.__getitem__, safeJSON.SafeListView.__getitem__]
+		telemetry = safeJSON.enableTelemetry()
+		try:
+			for i in range(3):
+				safeJsonObject['missing']
+				safeJsonObject['a'][5]
+			safeJsonObject['a'][1]['c']
+			safeJsonObject['a'][-3]
+			safeJsonObject['a'][0]
+			view['missing']
+			view['a'][2]
+			self.assertTrue(telemetry.snapshot() == {'missing' : 4, '[5]' : 3, 'c' : 1, '[-3]' : 1, '[2]' : 1}, "Expected misses to be counted by key.")
+			self.assertTrue(telemetry.mostCommon(1) == [('missing', 4)], "Expected the most common miss to be 'missing'.")
+			self.assertTrue(safeJsonObject['a'][1:] == [{'b' : 2}] and safeJsonObject['a'][0] == 1, "Expected hits to be unaffected.")
+			telemetry.reset()
+			self.assertTrue(telemetry.snapshot() == {}, "Expected reset to clear the counts.")
+
+			telemetry = safeJSON.enableTelemetry(sampleEvery=10)
+			for i in range(95):
+				safeJsonObject['missing']
+			self.assertTrue(telemetry.snapshot() == {'missing' : 90}, "Expected one miss in ten to be counted ten times.")
+			runningMethod = safeJSON.SafeList.__dict__['__getitem__']
+		finally:
+			safeJSON.disableTelemetry()
+		self.assertTrue(runningMethod(safeJsonObject['a'], 5) is SafeNone, "Expected a counting method still running while telemetry is disabled not to raise.")
+		telemetry.reset()
+		safeJsonObject['missing']
+		self.assertTrue(telemetry.snapshot() == {}, "Expected nothing to be counted once disabled.")
+		self.assertTrue([safeJSON.SafeDict.__missing__, safeJSON.SafeList.__getitem__, safeJSON.SafeListView.__getitem__] == originals, "Expected disabling to restore the original methods.")
+
+	def testFrozen(self):
+		logger.info("Testing frozen decoding")
+		jsonString = open(os.sep.join(['testData','test.json'])).read()
+		testObject = json.loads(jsonString)
+		for kwargs in [{}, {'singlePass' : True}, {'internTable' : safeJSON.InternTable()}]:
+			parser = safeJSON.SafeJSONParser(frozen=True, **kwargs)
+			safeJsonObject = parser.loads(jsonString)
+			self.doTestLoadLoads(testObject, safeJsonObject)
+			self.assertTrue(type(safeJsonObject) is safeJSON.FrozenSafeDict, "Expected objects to be frozen.")
+			self.assertTrue(type(safeJsonObject['testNested1']) is safeJSON.FrozenSafeList, "Expected arrays to be frozen.")
+			self.assertTrue(type(safeJsonObject['testNested1'][0]['dictKey3']) is safeJSON.FrozenSafeList, "Expected nested arrays to be frozen.")
+			self.assertTrue(hash(safeJsonObject) == hash(parser.loads(jsonString)), "Expected equal frozen objects to hash equally.")
+		projected = parser.loads(jsonString, ['testNested1.dictKey3', 'testDict'])
+		self.assertTrue(type(projected['testNested1'][0]) is safeJSON.FrozenSafeDict, "Expected projections to be frozen.")
+		self.assertTrue({projected : 1}[parser.loads(jsonString, {'testDict' : True, 'testNested1' : {'dictKey3' : True}})] == 1, "Expected frozen objects to work as dict keys.")
+
+		safeJsonObject = safeJSON.SafeJSONParser(frozen=True).loads('{"a" : [1, {"b" : 2}]}')
+		modifiers = [
+			lambda: safeJsonObject.__setitem__('a', 1),
+			lambda: safeJsonObject.__delitem__('a'),
+			lambda: safeJsonObject.update({'c' : 3}),
+			lambda: safeJsonObject.setdefault('c', 3),
+			lambda: safeJsonObject.pop('a'),
+			lambda: safeJsonObject.clear(),
+			lambda: safeJsonObject['a'].append(3),
+			lambda: safeJsonObject['a'].__setitem__(0, 3),
+			lambda: safeJsonObject['a'].__delitem__(0),
+			lambda: safeJsonObject['a'].__iadd__([3]),
+			lambda: safeJsonObject['a'].sort(),
+			lambda: safeJsonObject['a'][1].__setitem__('b', 3),
+		]
+		for modifier in modifiers:
+			exceptionRaised = False
+			try:
+				modifier()
+			except TypeError:
+				exceptionRaised = True
+			self.assertTrue(exceptionRaised, "Expected modifying a frozen object to raise a TypeError.")
+		self.assertTrue(safeJsonObject == {'a' : [1, {'b' : 2}]}, "Expected the frozen object to be unchanged.")
+		self.assertTrue(safeJsonObject['missing'] is SafeNone and safeJsonObject['a'][5] is SafeNone, "Expected to get a SafeNone object.")
+		self.assertTrue(copy.copy(safeJsonObject) is safeJsonObject and copy.deepcopy(safeJsonObject) is safeJsonObject and safeJsonObject.copy() is safeJsonObject, "Expected copies of a frozen object to be the object itself.")
+		unpickled = pickle.loads(pickle.dumps(safeJsonObject, 2))
+		self.assertTrue(unpickled == safeJsonObject and type(unpickled['a'][1]) is safeJSON.FrozenSafeDict, "Expected frozen objects to stay frozen when pickled.")
+
+	def testCache(self):
+		logger.info("Testing the result cache")
+		parser = safeJSON.SafeJSONParser(cacheSize=2)
+		first = parser.loads('{"a" : [1]}')
+		self.assertTrue(parser.loads('{"a" : [1]}') is first, "Expected a repeated document to return the cached result.")
+		self.assertTrue(parser.loads(bytearray('{"a" : [1]}')) is first, "Expected binary input to share the cache.")
+		self.assertTrue(type(first) is safeJSON.FrozenSafeDict, "Expected cached results to be frozen.")
+		self.assertTrue(parser.loads('{"a" : [1]}', ['a']) is not first, "Expected projections not to be cached.")
+		parser.loads('[2]')
+		parser.loads('[3]')
+		self.assertTrue(parser.loads('{"a" : [1]}') is not first, "Expected the least recently used result to be evicted.")
+		self.assertTrue(parser.cacheInfo() == (2, 4, 2, 2, 14, None), "Expected the cache to count hits and misses.")
+
+		parser = safeJSON.SafeJSONParser(cacheSize=10, cacheBytes=8)
+		for document in ['[1, 2, 3]', '[1]', '[2]', '[3]']:
+			parser.loads(document)
+		info = parser.cacheInfo()
+		self.assertTrue(info.size == 2 and info.bytes == 6, "Expected the cache to be bounded by the size of the documents.")
+		parser.clearCache()
+		self.assertTrue(parser.cacheInfo() == (0, 0, 0, 10, 0, 8), "Expected clearCache to empty the cache.")
+
+		parser.loads('[1]')
+		unpickled = pickle.loads(pickle.dumps(parser))
+		self.assertTrue(unpickled.cacheInfo().size == 0 and unpickled.loads('[1]') == [1], "Expected a pickled parser to start with an empty cache.")
+
+	def testPack(self):
+		logger.info("Testing pack, unpack and share")
+		jsonString = open(os.sep.join(['testData','test.json'])).read()
+		testObject = json.loads(jsonString)
+		safeJsonObject = safeJSON.loads(jsonString)
+		self.doTestLoadLoads(testObject, safeJSON.unpack(safeJSON.pack(safeJsonObject)))
+		self.doTestLoadLoads(testObject, safeJSON.unpack(safeJSON.pack(safeJSON.SafeJSONParser(lazy=True).loads(jsonString))))
+
+		safeJsonObject['missing'] = SafeNone
+		safeJsonObject['testNested1'][0]['dictKey3'].append(SafeNone)
+		unpacked = safeJSON.unpack(bytearray(safeJSON.pack(safeJsonObject)))
+		self.assertTrue(unpacked == safeJsonObject, "Expected unpacking to return an equal tree.")
+		self.assertTrue(unpacked['missing'] is SafeNone and unpacked['testNested1'][0]['dictKey3'][3] is SafeNone, "Expected SafeNone to unpack as SafeNone.")
+		self.assertTrue(type(unpacked['testNested1'][0]) is safeJSON.SafeDict, "Expected unpacked containers to be safe.")
+		self.assertTrue(safeJSON.unpack(safeJSON.pack(SafeNone)) is SafeNone, "Expected SafeNone to unpack as SafeNone.")
+
+		frozen = safeJSON.unpack(safeJSON.pack(safeJSON.SafeJSONParser(frozen=True).loads(jsonString)))
+		self.assertTrue(type(frozen) is safeJSON.FrozenSafeDict and type(frozen['testNested1'][0]) is safeJSON.FrozenSafeDict, "Expected frozen trees to unpack frozen.")
+
+		compact = safeJSON.SafeJSONParser(schemas=[['x', 'y']], compactArrays=3).loads('{"points": [{"x": 1, "y": {"x": [1, 2, 3], "y": null}}], "readings": [0.5, 1.5, 2.5]}')
+		unpacked = safeJSON.unpack(safeJSON.pack(compact))
+		self.assertTrue(unpacked == compact and type(unpacked['points'][0]) is type(compact['points'][0]) and type(unpacked['points'][0]['y']) is type(compact['points'][0]['y']), "Expected records to unpack as records of the same type.")
+		self.assertTrue(type(unpacked['readings']) is safeJSON.SafeArray and unpacked['readings'].typecode == 'd' and type(unpacked['points'][0]['y']['x']) is safeJSON.SafeArray, "Expected SafeArrays to unpack as SafeArrays.")
+		self.assertTrue(type(safeJSON.unpack(safeJSON.pack(compact['points'][0]))) is type(compact['points'][0]), "Expected a record to unpack as a record.")
+
+		deep = []
+		for i in range(5000):
+			deep = [deep]
+		exceptionRaised = False
+		try:
+			safeJSON.pack(deep)
+		except ValueError:
+			exceptionRaised = True
+		self.assertTrue(exceptionRaised, "Expected trees too deep for marshal to raise a ValueError.")
+
+		exceptionRaised = False
+		try:
+			safeJSON.unpack(pickle.dumps(testObject))
+		except ValueError:
+			exceptionRaised = True
+		self.assertTrue(exceptionRaised, "Expected data not written by pack to raise a ValueError.")
+
+		with safeJSON.share(safeJsonObject) as shared:
+			readBack = pickle.loads(pickle.dumps(shared)).get()
+			self.assertTrue(readBack == safeJsonObject and readBack['missing'] is SafeNone, "Expected a shared tree to be read back.")
+		self.assertTrue(not os.path.exists(shared.path), "Expected the shared copy to be freed.")
+
+	def testColumns(self):
+		logger.info("Testing columns")
+		jsonString = '[{"user": {"id": 1}, "score": 1.5, "tags": ["a"]}, {"user": {"id": 2}, "tags": "xy"}, {"user": {"id": null}, "score": 3, "tags": ["c"]}]'
+		for records in (safeJSON.loads(jsonString), json.loads(jsonString), iter(safeJSON.SafeJSONParser(lazy=True).loads(jsonString))):
+			columns, masks = safeJSON.columns(records, ['user.id', 'score', 'tags[0]'], masks=True, useNumpy=False)
+			self.assertTrue(columns.keys() == ['user.id', 'score', 'tags[0]'], "Expected a column for each path, in order.")
+			self.assertTrue(columns['score'].typecode == 'd' and columns['score'][0] == 1.5 and columns['score'][1] != columns['score'][1], "Expected a missing number to be NaN.")
+			self.assertTrue(columns['tags[0]'] == [u'a', None, u'c'], "Expected other values in a list.")
+			self.assertTrue(list(masks['user.id']) == [0, 0, 1] and list(masks['tags[0]']) == [0, 1, 0], "Expected masks to mark missing and null values.")
+
+		columns = safeJSON.columns(safeJSON.loads(jsonString), ['user.id', 'missing'], fill=0, useNumpy=False)
+		self.assertTrue(columns['user.id'].typecode == 'l' and list(columns['user.id']) == [1, 2, 0], "Expected integer columns to be filled.")
+		self.assertTrue(columns['missing'] == [0, 0, 0], "Expected missing columns to be filled.")
+		self.assertTrue(safeJSON.columns([{'a': 2 ** 70}], ['a'], useNumpy=False)['a'] == [2 ** 70], "Expected large integers in a list.")
+
+		exceptionRaised = False
+		try:
+			safeJSON.columns([], ['tags[*]'])
+		except ValueError:
+			exceptionRaised = True
+		self.assertTrue(exceptionRaised, "Expected wildcards to raise a ValueError.")
+
+	def testRecords(self):
+		logger.info("Testing records")
+		jsonString = '{"results": [{"id": 1, "name": "a", "tags": ["x"]}, {"name": "b", "id": 2, "tags": []}, {"id": 3}]}'
+		schemas = safeJSON.inferSchemas([json.loads(jsonString)], minCount=2)
+		self.assertTrue(len(schemas) == 1 and set(schemas[0]) == set(['id', 'name', 'tags']), "Expected the repeated object to be inferred.")
+		parser = safeJSON.SafeJSONParser(schemas=schemas)
+		safeJsonObject = parser.loads(jsonString)
+		record = safeJsonObject['results'][1]
+		self.assertTrue(isinstance(record, safeJSON.SafeRecord) and type(record) is type(safeJsonObject['results'][0]), "Expected matching objects to be records.")
+		self.assertTrue(type(safeJsonObject['results'][2]) is safeJSON.SafeDict, "Expected other objects to be SafeDicts.")
+		self.assertTrue(record['id'] == 2 and record['missing'] is SafeNone and record['missing']['deeper'] is SafeNone, "Expected records to subscript like SafeDicts.")
+		self.assertTrue(type(record['tags']) is safeJSON.SafeList, "Expected record values to be safe.")
+		self.assertTrue(record == {'id': 2, 'name': 'b', 'tags': []} and safeJsonObject == json.loads(jsonString), "Expected records to equal dicts.")
+		self.assertTrue(pickle.loads(pickle.dumps(safeJsonObject)) == safeJsonObject and copy.deepcopy(record) == record, "Expected records to pickle and copy.")
+		self.assertTrue(pickle.loads(pickle.dumps(parser)).loads(jsonString) == safeJsonObject, "Expected a pickled parser to build records.")
+		self.assertTrue(json.loads(safeJSON.dumps(safeJsonObject)) == json.loads(jsonString), "Expected records to be serialized as objects.")
+
+		record['id'] = 5
+		self.assertTrue(record['id'] == 5, "Expected record fields to be replaceable.")
+		exceptionRaised = False
+		try:
+			record['new'] = 1
+		except KeyError:
+			exceptionRaised = True
+		self.assertTrue(exceptionRaised, "Expected adding a field to a record to raise a KeyError.")
+
+	def testIndexFile(self):
+		logger.info("Testing indexFile")
+		jsonString = open(os.sep.join(['testData','test.json'])).read()
+		testObject = json.loads(jsonString)
+		fd, filename = tempfile.mkstemp(suffix='.json')
+		os.close(fd)
+		try:
+			with open(filename, 'w') as f:
+				json.dump(testObject, f, indent=2)
+			with safeJSON.indexFile(filename) as index:
+				self.assertTrue(set(index.keys) == set(testObject) and len(index) == len(testObject), "Expected every top level key to be indexed.")
+				for key in testObject:
+					self.assertTrue(index[key] == testObject[key], "Expected the indexed value of {0!r} to be decoded.".format(key))
+				self.assertTrue(type(index['testNested1'][0]) is safeJSON.SafeDict and index['missing'] is SafeNone, "Expected lookups to be safe.")
+			self.assertTrue(os.path.exists(filename + '.index'), "Expected the index to be saved.")
+			with safeJSON.indexFile(filename, 'testNested1') as index:
+				self.assertTrue(list(index) == testObject['testNested1'] and index[-1] == testObject['testNested1'][-1] and index[99] is SafeNone, "Expected array elements to be indexed.")
+
+			with open(filename, 'w') as f:
+				f.write('{"a": [[1, 2], [3, 4], [5, 6]]}')
+			with safeJSON.indexFile(filename, 'a[-1]') as index:
+				self.assertTrue(list(index) == [5, 6], "Expected negative indexes to count from the end.")
+
+			with open(filename, 'w') as f:
+				f.write('\n'.join(json.dumps(value) for value in testObject['testNested1']) + '\n')
+			os.utime(filename, (0, 0))
+			with safeJSON.indexFile(filename, lines=True) as index:
+				self.assertTrue(list(index) == testObject['testNested1'], "Expected a changed file to be indexed again.")
+		finally:
+			for name in (filename, filename + '.index'):
+				if os.path.exists(name):
+					os.remove(name)
+
+	def testCompactArrays(self):
+		logger.info("Testing compactArrays")
+		jsonString = '{"readings": [0.5, 1.5, 2.5], "counts": [[1, 2, 3], [4]], "mixed": [1, 2.5, 3], "flags": [true, false, true]}'
+		testObject = json.loads(jsonString)
+		for parser in (safeJSON.SafeJSONParser(compactArrays=3), safeJSON.SafeJSONParser(compactArrays=3, singlePass=True)):
+			safeJsonObject = parser.loads(jsonString)
+			readings = safeJsonObject['readings']
+			self.assertTrue(type(readings) is safeJSON.SafeArray and readings.typecode == 'd', "Expected floats to be compacted.")
+			self.assertTrue(type(safeJsonObject['counts'][0]) is safeJSON.SafeArray and safeJsonObject['counts'][0].typecode == 'l', "Expected nested integers to be compacted.")
+			self.assertTrue(type(safeJsonObject['counts'][1]) is safeJSON.SafeList, "Expected short arrays to stay SafeLists.")
+			self.assertTrue(type(safeJsonObject['mixed']) is safeJSON.SafeList and type(safeJsonObject['flags']) is safeJSON.SafeList, "Expected mixed arrays to stay SafeLists.")
+			self.assertTrue(safeJsonObject == testObject and readings == [0.5, 1.5, 2.5], "Expected compacted arrays to equal lists.")
+			self.assertTrue(readings[3] is SafeNone and readings[-4] is SafeNone and readings[-1] == 2.5, "Expected out of range indexes to return SafeNone.")
+			self.assertTrue(type(readings[1:]) is safeJSON.SafeArray and readings[1:] == [1.5, 2.5], "Expected slices to be SafeArrays.")
+			self.assertTrue(str(buffer(readings)) == readings.tostring(), "Expected the numbers to be available as a buffer.")
+			self.assertTrue(pickle.loads(pickle.dumps(safeJsonObject, 2)) == testObject and type(copy.deepcopy(readings)) is safeJSON.SafeArray, "Expected SafeArrays to pickle and copy.")
+			self.assertTrue(json.loads(safeJSON.dumps(safeJsonObject)) == testObject and safeJSON.unpack(safeJSON.pack(safeJsonObject)) == testObject, "Expected SafeArrays to be serialized as arrays.")
+
+		counts = safeJSON.SafeJSONParser(compactArrays=3).loads('[1, 2, 3]')
+		self.assertTrue(not isinstance(counts, list) and type(counts + [4.5]) is safeJSON.SafeList and [0] + counts == [0, 1, 2, 3] and type(counts * 2) is safeJSON.SafeArray, "Expected adding lists to SafeArrays to give SafeLists.")
+		counts.append(4)
+		counts.extend([5])
+		counts += [6]
+		counts[0] = 7
+		counts[1:2] = [8]
+		self.assertTrue(counts == [7, 8, 3, 4, 5, 6], "Expected integers to be added to an integer SafeArray.")
+		for change in (lambda: counts.append(4.5), lambda: counts.append(None), lambda: counts.insert(0, 'x'), lambda: counts.extend([9, 'x']), lambda: counts.__iadd__([9, None]), lambda: counts.__setitem__(0, 1.5), lambda: counts.__setslice__(0, 1, [9, 1.5])):
+			exceptionRaised = False
+			try:
+				change()
+			except TypeError:
+				exceptionRaised = True
+			self.assertTrue(exceptionRaised and counts == [7, 8, 3, 4, 5, 6], "Expected values an integer SafeArray cannot hold to raise a TypeError and change nothing.")
+		readings = safeJSON.SafeArray('d', [0.5])
+		readings.append(1)
+		self.assertTrue(readings == [0.5, 1.0] and type(readings[1]) is float, "Expected integers to be added to a float SafeArray as floats.")
+
+	def testWhere(self):
+		logger.info("Testing where")
+		lines = [json.dumps({'type': recordType, 'user': {'id': i}, 'flag': None if i % 2 else 0}) for i, recordType in enumerate(['click', 'view', 'click', 'purchase'])]
+		text = '\n'.join(lines + ['{"type": "view", "note": "click"}', '{"type": "cl\\u0069ck"}'])
+		reader = safeJSON.iterLoad(StringIO.StringIO(text), where={'type': 'click'})
+		records = list(reader)
+		self.assertTrue([record['user']['id'] for record in records] == [0, 2] and type(records[0]) is safeJSON.SafeDict, "Expected only matching records to be read.")
+		self.assertTrue((reader.filter.scanned, reader.filter.matched, reader.filter.rejected, reader.filter.prefiltered) == (6, 2, 4, 3), "Expected the records to be counted.")
+		records = list(safeJSON.iterLoad(StringIO.StringIO(text), where=safeJSON.RecordFilter({'type': 'click'}, prefilter=False)))
+		self.assertTrue(len(records) == 3, "Expected escaped values to match without the prefilter.")
+		records = list(safeJSON.iterLoad(StringIO.StringIO(text), where={'flag': 0}))
+		self.assertTrue([record['user']['id'] for record in records] == [0, 2], "Expected missing values not to match.")
+		typed = '{"flag": 0}\n{"flag": false}\n{"flag": null}\n{"flag": 1}\n{"flag": true}'
+		for where, expected in (({'flag': False}, [False]), ({'flag': 0}, [0]), ({'flag': None}, [None]), ({'flag': True}, [True]), ({'flag': 1}, [1])):
+			for prefilter in (True, False):
+				records = list(safeJSON.iterLoad(StringIO.StringIO(typed), where=safeJSON.RecordFilter(where, prefilter=prefilter)))
+				found = [record['flag'] for record in records]
+				self.assertTrue(found == expected and [type(flag) for flag in found] == [type(flag) for flag in expected], "Expected booleans and nulls not to match numbers, with or without the prefilter.")
+		records = list(safeJSON.iterLoad(StringIO.StringIO(text), where=lambda o: o['user']['id'] > 1))
+		self.assertTrue([record['user']['id'] for record in records] == [2, 3], "Expected functions to select records.")
+		records = list(safeJSON.iterArray(StringIO.StringIO('[' + ','.join(lines) + ']'), where={'type': 'view'}))
+		self.assertTrue(records == [json.loads(lines[1])], "Expected iterArray to select elements.")
+
+		recordFilter = safeJSON.RecordFilter({'type': 'click', 'user.id': 2})
+		records = safeJSON.loadsMany(lines, processes=2, where=recordFilter)
+		self.assertTrue(records == [json.loads(lines[2])] and (recordFilter.scanned, recordFilter.matched) == (4, 1), "Expected loadsMany to select and count records.")
+
+		exceptionRaised = False
+		try:
+			safeJSON.RecordFilter({'user[*]': 1})
+		except ValueError:
+			exceptionRaised = True
+		self.assertTrue(exceptionRaised, "Expected wildcards to raise a ValueError.")
+
+	def testPatch(self):
+		logger.info("Testing applyPatch and mergePatch")
+		jsonString = open(os.sep.join(['testData','test.json'])).read()
+		safeJsonObject = safeJSON.loads(jsonString)
+		patch = [
+			{'op': 'add', 'path': '/added', 'value': {'nested': [1, {'deeper': True}]}},
+			{'op': 'add', 'path': '/testNested1/-', 'value': 'last'},
+			{'op': 'replace', 'path': '/testNested1/0/dictKey3/0', 'value': 'replaced'},
+			{'op': 'copy', 'from': '/added', 'path': '/copied'},
+			{'op': 'move', 'from': '/copied/nested', 'path': '/moved'},
+			{'op': 'remove', 'path': '/added/nested/0'},
+			{'op': 'test', 'path': '/moved/1/deeper', 'value': True}
+		]
+		patched = safeJSON.applyPatch(safeJsonObject, json.dumps(patch))
+		self.assertTrue(patched is safeJsonObject, "Expected the tree to be patched in place.")
+		self.assertTrue(patched['added']['nested'] == [{'deeper': True}] and type(patched['added']['nested'][0]) is safeJSON.SafeDict, "Expected added values to be transcoded.")
+		self.assertTrue(patched['testNested1'][-1] == 'last' and patched['testNested1'][0]['dictKey3'][0] == 'replaced', "Expected array elements to be added and replaced.")
+		self.assertTrue(patched['copied'] == {} and patched['moved'] == [1, {'deeper': True}], "Expected values to be copied and moved.")
+		self.assertTrue(patched['moved'][1] is not patched['added']['nested'][0], "Expected copied values not to be shared.")
+
+		before = copy.deepcopy(safeJsonObject)
+		exceptionRaised = False
+		try:
+			safeJSON.applyPatch(safeJsonObject, [{'op': 'remove', 'path': '/added'}, {'op': 'test', 'path': '/moved/0', 'value': 2}])
+		except ValueError:
+			exceptionRaised = True
+		self.assertTrue(exceptionRaised and safeJsonObject == before, "Expected a failed patch to raise a ValueError and be undone.")
+		for path, value in (('/flags/0', 1), ('/flags/1', 0), ('/count', True), ('/none', 0), ('/nested', {'a': [1]})):
+			exceptionRaised = False
+			try:
+				safeJSON.applyPatch(safeJSON.loads('{"flags": [true, false], "count": 1, "none": null, "nested": {"a": [true]}}'), [{'op': 'test', 'path': path, 'value': value}])
+			except ValueError:
+				exceptionRaised = True
+			self.assertTrue(exceptionRaised, "Expected 'test' not to count booleans and null as numbers.")
+		self.assertTrue(safeJSON.applyPatch(safeJSON.loads('{"a": [1, {"b": false}]}'), [{'op': 'test', 'path': '/a', 'value': [1.0, {'b': False}]}]) == {'a': [1, {'b': False}]}, "Expected 'test' to compare values as JSON does.")
+
+		merged = safeJSON.mergePatch(safeJsonObject, '{"added": null, "moved": [3], "testNested1": {"new": {"a": 1}}}')
+		self.assertTrue(merged is safeJsonObject and merged['added'] is SafeNone and merged['moved'] == [3], "Expected merge patches to remove and replace keys.")
+		self.assertTrue(merged['testNested1'] == {'new': {'a': 1}} and type(merged['testNested1']['new']) is safeJSON.SafeDict, "Expected merged values to be transcoded.")
+		self.assertTrue(safeJSON.mergePatch(safeJsonObject, '[1]') == [1], "Expected a patch that is not an object to replace the tree.")
+
+		parser = safeJSON.SafeJSONParser(schemas=[['x', 'y']])
+		records = parser.loads('{"pt": {"x": 1, "y": 2}}')
+		for patch in ({'pt': {'x': 9, 'z': 3}}, {'pt': {'x': 9, 'y': None}}):
+			exceptionRaised = False
+			try:
+				parser.mergePatch(records, patch)
+			except ValueError:
+				exceptionRaised = True
+			self.assertTrue(exceptionRaised and records['pt'] == {'x': 1, 'y': 2}, "Expected merge patches that change the fields of records to raise a ValueError and be undone.")
+		self.assertTrue(parser.mergePatch(records, {'pt': {'x': 9}})['pt'] == {'x': 9, 'y': 2}, "Expected the fields of records to be merged.")
+
+		parser = safeJSON.SafeJSONParser(frozen=True)
+		merged = parser.mergePatch(parser.loads('[1]'), {'a': {'b': 1, 'c': None}})
+		self.assertTrue(merged == {'a': {'b': 1}} and type(merged['a']) is safeJSON.FrozenSafeDict, "Expected merge patches to build frozen trees.")
+		exceptionRaised = False
+		try:
+			parser.mergePatch(merged, {'a': None})
+		except ValueError:
+			exceptionRaised = True
+		self.assertTrue(exceptionRaised and merged == {'a': {'b': 1}}, "Expected merging into frozen trees to raise a ValueError.")
+
+	def testDumps(self):
+		logger.info("Testing dumps and dump")
+		testObject = json.load(open(os.sep.join(['testData','test.json'])))
+		safeJsonObject = safeJSON.loads(json.dumps(testObject))
+		self.assertTrue(json.loads(safeJSON.dumps(safeJsonObject)) == testObject, "Expected safe objects to encode like plain ones.")
+		self.assertTrue(safeJSON.dumps(SafeNone) == 'null', "Expected SafeNone to encode as null.")
+		self.assertTrue(safeJSON.dumps(safeJSON.SafeJSONParser(lazy=True).loads('{"a": [1]}')) == '{"a": [1]}', "Expected views to encode like the objects underneath.")
+
+		testObject = {'a' : SafeNone, 'b' : [SafeNone, 1], 'c' : {'d' : SafeNone}}
+		self.assertTrue(json.loads(safeJSON.dumps(testObject)) == {'a' : None, 'b' : [None, 1], 'c' : {'d' : None}}, "Expected SafeNone to encode as null.")
+		self.assertTrue(json.loads(safeJSON.dumps(testObject, skipSafeNone=True)) == {'b' : [None, 1], 'c' : {}}, "Expected members holding SafeNone to be skipped.")
+
+		testObject = {'results' : [{'id' : i, 'tags' : ['a', 'b'], 'score' : i / 2.0} for i in range(200)], 'count' : 200}
+		for kwargs in [{}, {'indent' : 2}, {'sort_keys' : True}, {'separators' : (',', ':')}]:
+			f = StringIO.StringIO()
+			safeJSON.dump(testObject, f, chunkSize=100, **kwargs)
+			self.assertTrue(f.getvalue() == json.dumps(testObject, **kwargs), "Expected dump to write what json.dumps returns for {0}.".format(kwargs))
+
+		testObject = deep = []
+		for i in range(5000):
+			deep.append([])
+			deep = deep[0]
+		deep.append({'a' : 1})
+		expected = '[' * 5001 + '{"a": 1}' + ']' * 5001
+		f = StringIO.StringIO()
+		safeJSON.dump({'deep' : testObject}, f)
+		self.assertTrue(safeJSON.dumps(testObject) == expected and f.getvalue() == '{"deep": ' + expected + '}', "Expected deep documents to be serialized without hitting the recursion limit.")
+
+		testObject = [0] * 100
+		testObject.append(testObject)
+		exceptionRaised = False
+		try:
+			safeJSON.dump(testObject, StringIO.StringIO())
+		except ValueError:
+			exceptionRaised = True
+		self.assertTrue(exceptionRaised, "Expected circular references to raise a ValueError.")
+
 	def doTestLoadLoads(self, testObject, safeJsonObject):
 		# Make sure the two objects are identical
 		self.assertTrue(